@@ -90,6 +90,37 @@ MONGO_CONFIG = {
 MONGO_URI = "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
 MONGO_DB_NAME = "MongoDB"
 
+# Source de la page détail : 'structured' (MOVIE_COMPLETE, repli sur les collections plates) ou 'flat'
+MOVIE_DETAIL_SOURCE = 'structured'
+
+# Filtres du tirage aléatoire de la page d'accueil (None pour tout le catalogue)
+HOME_RANDOM_FILTERS = {'title_type': 'movie', 'min_votes': 1000}
+
+# Cache des agrégations de /stats : durée de vie max et fréquence de relecture des générations d'import (secondes)
+STATS_CACHE_TTL = 24 * 3600
+STATS_CACHE_CHECK_INTERVAL = 30
+
+# Nombre de noms de personnes (pid -> primaryName) gardés en mémoire par processus
+PERSON_NAME_CACHE_SIZE = 100000
+
+# Stockage des identifiants IMDb dans SQLite et MongoDB : 'text' ('tt0111161') ou 'integer' (111161).
+# Doit correspondre à la base importée (import_data.py --integer-ids pour 'integer').
+IMDB_ID_STORAGE = 'text'
+
+# Listes de référence (genres, types de titre, catégories) : fréquence de relecture de la génération d'import (secondes)
+REFERENCE_DATA_CHECK_INTERVAL = 30
+
+# Autocomplétion : snapshot pré-construit (python manage.py build_autocomplete) et taille de l'index par type
+AUTOCOMPLETE_SNAPSHOT = BASE_DIR / 'data' / 'autocomplete.pkl'
+AUTOCOMPLETE_MAX_ENTRIES = 200000
+# Fréquence de relecture de la génération de SEARCH_INDEX (collection META) par l'autocomplétion (secondes)
+AUTOCOMPLETE_CHECK_INTERVAL = 30
+
+# Pagination du catalogue : 'keyset' (curseur dans l'URL) ou 'offset' (Paginator classique)
+CATALOGUE_PAGINATION = 'keyset'
+# Durée de mise en cache du nombre total de résultats par filtre (secondes)
+CATALOGUE_COUNT_CACHE_TTL = 600
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -22,6 +22,7 @@ from movies import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('search/', views.search, name='search'),
+    path('api/autocomplete/', views.autocomplete, name='autocomplete'),
     path('stats/', views.stats, name='stats'),
     path('movies/', views.movies, name='movies'),
     path('movies/<str:mid>/', views.movie_detail, name='movie_detail'),
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import models
+
+from .services.ids import MOVIE_PREFIX, decode, encode
+
+
+def integer_ids():
+    return settings.IMDB_ID_STORAGE == 'integer'
+
+
+def db_id(value):
+    # Identifiant public ('tt0111161') -> valeur stockée, pour les requêtes hors ORM (MongoDB, SQL brut)
+    return encode(value) if integer_ids() else value
+
+
+class ImdbIdField(models.CharField):
+    """Identifiant IMDb, stocké en texte ou en entier selon IMDB_ID_STORAGE.
+
+    Côté Python la valeur reste toujours 'tt0111161' : la conversion se fait
+    à l'écriture des requêtes (get_prep_value) et à la lecture des lignes
+    (from_db_value), les vues et les URL n'ont donc rien à changer.
+    """
+
+    def __init__(self, *args, prefix=MOVIE_PREFIX, **kwargs):
+        self.prefix = prefix
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.prefix != MOVIE_PREFIX:
+            kwargs['prefix'] = self.prefix
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return decode(value, self.prefix)
+
+    def to_python(self, value):
+        return decode(value, self.prefix) if value is not None else value
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is not None and integer_ids():
+            return encode(value)
+        return value
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.services.autocomplete import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Construit le snapshot de l'autocomplétion (AUTOCOMPLETE_SNAPSHOT) depuis SEARCH_INDEX"
+
+    def handle(self, *args, **options):
+        start = time.time()
+        index = build_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(index.items)} entrées, {len(index.keys)} clés, "
+            f"{len(index.tops)} préfixes pré-calculés en {time.time() - start:.2f}s"
+        ))
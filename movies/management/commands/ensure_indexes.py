@@ -0,0 +1,91 @@
+import itertools
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from movies.pagination import cursor_querysets
+from movies.services.catalogue import SORT_FIELDS, catalogue_queryset
+from movies.services.index_manager import INDEXES, ensure_indexes, explain, full_scans, seeks_on, temp_sorts
+
+# Combinaisons de filtres du catalogue dont le plan doit utiliser un index
+HOT_FILTERS = [
+    {},
+    {'genre': 'Drama'},
+    {'year_min': 1990, 'year_max': 2000},
+    {'rating_min': 8},
+    {'genre': 'Drama', 'rating_min': 8},
+    {'genre': 'Drama', 'year_min': 1990, 'year_max': 2000},
+]
+
+# Position d'un curseur de page suivante pour chaque tri : valeur non NULL, puis NULL
+CURSOR_VALUES = {
+    'startyear': [1995, None],
+    'primarytitle': ['M', None],
+    'rating': [7.5, None],
+}
+CURSOR_MID = 'tt0500000'
+
+
+class Command(BaseCommand):
+    help = "Crée les index déclarés dans movies.services.index_manager et vérifie les plans des requêtes du catalogue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check-only', action='store_true', help="Ne crée rien, vérifie seulement les plans")
+
+    def handle(self, *args, **options):
+        conn = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            if not options['check_only']:
+                created = ensure_indexes(conn)
+                for name in created:
+                    self.stdout.write(f"Index créé : {name}")
+                self.stdout.write(f"{len(INDEXES)} index déclarés, {len(created)} créés")
+
+            failures = []
+            for filters, (sort_by, (field, tiebreak)), order in itertools.product(HOT_FILTERS, SORT_FIELDS.items(), ['desc', 'asc']):
+                prefix = '-' if order == 'desc' else ''
+                queryset = catalogue_queryset(**filters)
+                label = f"{filters or 'sans filtre'} tri={sort_by} {order}"
+                # Première page, puis chaque requête d'une page suivante (celles qui doivent se positionner dans l'index)
+                checks = [(label, queryset.order_by(f'{prefix}{field}', f'{prefix}{tiebreak}'), None)]
+                column = queryset.model._meta.get_field(field).column
+                for value in CURSOR_VALUES[sort_by]:
+                    parts = cursor_querysets(queryset, field, tiebreak, order == 'desc', value, CURSOR_MID)
+                    checks += [
+                        (f"{label} après {value!r} ({i + 1}/{len(parts)})", part, column)
+                        for i, part in enumerate(parts)
+                    ]
+
+                for check_label, check_queryset, seek_column in checks:
+                    if self._check(check_queryset[:21], check_label, seek_column):
+                        failures.append(check_label)
+        finally:
+            conn.close()
+
+        if failures:
+            raise CommandError(f"{len(failures)} requête(s) du catalogue font un parcours complet de table ou d'index")
+
+    def _check(self, queryset, label, seek_column=None):
+        """True si le plan est à corriger.
+
+        Une requête de page suivante qui lit l'index dans l'ordre du tri doit
+        en plus s'y positionner sur la colonne de tri (seek_column) : sans cela
+        elle relit l'index depuis le début et coûte d'autant plus que la page
+        est loin. Avec un tri temporaire, elle coûte autant que la première page.
+        """
+        sql, params = queryset.query.sql_with_params()
+        plan = explain(connection, sql, params)
+        if full_scans(plan):
+            self.stdout.write(self.style.ERROR(f"SCAN COMPLET   {label} : {' | '.join(plan)}"))
+            return True
+        if seek_column and not temp_sorts(plan) and not seeks_on(plan, seek_column):
+            self.stdout.write(self.style.ERROR(f"SANS POSITION  {label} : {' | '.join(plan)}"))
+            return True
+        if temp_sorts(plan):
+            # Tri des seules lignes trouvées par l'index (ex. un genre) : signalé sans échouer
+            self.stdout.write(self.style.WARNING(f"TRI TEMPORAIRE {label} : {' | '.join(plan)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"OK             {label}"))
+        return False
@@ -0,0 +1,19 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movies.services.materialize import rebuild_movie_browse
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la table dénormalisée du catalogue (MOVIE_BROWSE), ses index et ses compteurs (CATALOGUE_FACETS)"
+
+    def handle(self, *args, **options):
+        conn = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            rows = rebuild_movie_browse(conn)
+        finally:
+            conn.close()
+
+        self.stdout.write(self.style.SUCCESS(f"MOVIE_BROWSE reconstruite : {rows} lignes"))
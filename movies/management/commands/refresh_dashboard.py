@@ -0,0 +1,23 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movies.services.materialize import refresh_dashboard_stats, refresh_row_counts
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs et le top 10 du tableau de bord (DASHBOARD_STATS) et les nombres de lignes (ROW_COUNTS)"
+
+    def handle(self, *args, **options):
+        conn = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            stats = refresh_dashboard_stats(conn)
+            counts = refresh_row_counts(conn)
+        finally:
+            conn.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"DASHBOARD_STATS mis à jour : {stats['total_films']} films, {len(stats['top_movies'])} dans le top"
+        ))
+        self.stdout.write(self.style.SUCCESS(f"ROW_COUNTS mis à jour : {len(counts)} tables"))
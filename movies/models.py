@@ -1,7 +1,10 @@
 from django.db import models
 
+from .fields import ImdbIdField
+from .services.ids import PERSON_PREFIX
+
 class Movie(models.Model):
-    mid = models.CharField(primary_key=True, max_length=20) 
+    mid = ImdbIdField(primary_key=True, max_length=20)
     titletype = models.CharField(db_column='titleType', max_length=50, blank=True, null=True)
     primarytitle = models.CharField(db_column='primaryTitle', max_length=500, blank=True, null=True)
     originaltitle = models.CharField(db_column='originalTitle', max_length=500, blank=True, null=True)
@@ -15,7 +18,7 @@ class Movie(models.Model):
         db_table = 'MOVIE'
 
 class Person(models.Model):
-    pid = models.CharField(primary_key=True, max_length=20) 
+    pid = ImdbIdField(primary_key=True, max_length=20, prefix=PERSON_PREFIX)
     primaryname = models.CharField(db_column='primaryName', max_length=255, blank=True, null=True)
     birthyear = models.TextField(db_column='birthYear', blank=True, null=True)
     deathyear = models.TextField(db_column='deathYear', blank=True, null=True)
@@ -67,7 +70,7 @@ class Genre(models.Model):
         unique_together = (('mid', 'genre'),)
 
 class Profession(models.Model):
-    pid = models.CharField(max_length=20, primary_key=True) 
+    pid = ImdbIdField(max_length=20, primary_key=True, prefix=PERSON_PREFIX)
     jobname = models.CharField(db_column='jobName', max_length=100)
 
     class Meta:
@@ -107,4 +110,33 @@ class Title(models.Model):
 
     class Meta:
         managed = False
-        db_table = 'TITLE'
\ No newline at end of file
+        db_table = 'TITLE'
+
+class MovieBrowse(models.Model):
+    # Table dénormalisée du catalogue (une ligne par film et par genre),
+    # reconstruite par movies.services.materialize.rebuild_movie_browse
+    mid = ImdbIdField(primary_key=True, max_length=20)
+    genre = models.CharField(max_length=50, blank=True, null=True)
+    is_primary = models.IntegerField()
+    primarytitle = models.CharField(db_column='primaryTitle', max_length=500, blank=True, null=True)
+    titletype = models.CharField(db_column='titleType', max_length=50, blank=True, null=True)
+    startyear = models.IntegerField(db_column='startYear', blank=True, null=True)
+    averagerating = models.FloatField(db_column='averageRating', blank=True, null=True)
+    numvotes = models.IntegerField(db_column='numVotes', blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'MOVIE_BROWSE'
+
+class CatalogueFacet(models.Model):
+    # Compteurs de MOVIE_BROWSE par (genre, année, note), reconstruits avec elle
+    # par movies.services.materialize.rebuild_catalogue_facets
+    genre = models.CharField(primary_key=True, max_length=50, blank=True)
+    startyear = models.IntegerField(db_column='startYear', blank=True, null=True)
+    averagerating = models.FloatField(db_column='averageRating', blank=True, null=True)
+    n = models.IntegerField()
+    n_primary = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'CATALOGUE_FACETS'
@@ -0,0 +1,126 @@
+import base64
+import json
+
+from django.db import connection
+from django.db.models import F
+
+from .fields import db_id
+
+
+def encode_cursor(value, mid):
+    raw = json.dumps([value, mid], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Curseur invalide ou fabriqué à la main : None, on repart de la première page
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, mid = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(mid, str) or isinstance(value, bool) or not isinstance(value, (int, float, str, type(None))):
+        return None
+    return value, mid
+
+
+def _ordered(queryset, field, tiebreak, descending):
+    prefix = '-' if descending else ''
+    return queryset.order_by(f'{prefix}{field}', f'{prefix}{tiebreak}')
+
+
+def _row_value(queryset, field, tiebreak, descending, value, mid):
+    """(field, tiebreak) strictement après (value, mid), en comparaison de ligne.
+
+    Écrit en SQL brut : SQLite sait positionner un index sur (col, mid) < (?, ?),
+    alors qu'un OR de conditions équivalent le fait parcourir depuis le début.
+    """
+    quote = connection.ops.quote_name
+    meta = queryset.model._meta
+    columns = ', '.join(f'{quote(meta.db_table)}.{quote(meta.get_field(name).column)}' for name in (field, tiebreak))
+    operator = '<' if descending else '>'
+    return queryset.extra(where=[f'({columns}) {operator} (%s, %s)'], params=[value, db_id(mid)])
+
+
+def cursor_querysets(queryset, field, tiebreak, descending, value, mid):
+    """Requêtes successives donnant les lignes situées après (value, mid), dans l'ordre.
+
+    SQLite considère NULL comme la plus petite valeur : en tri croissant
+    les NULL viennent en premier, en tri décroissant en dernier. Chaque
+    morceau (valeurs non NULL, puis NULL ou l'inverse) est une requête
+    séparée qui se sert directement de l'index.
+    """
+    is_null = {f'{field}__isnull': True}
+    not_null = {f'{field}__isnull': False}
+    if descending:
+        if value is None:
+            parts = [queryset.filter(**is_null, **{f'{tiebreak}__lt': mid})]
+        else:
+            parts = [_row_value(queryset, field, tiebreak, True, value, mid), queryset.filter(**is_null)]
+    elif value is None:
+        parts = [queryset.filter(**is_null, **{f'{tiebreak}__gt': mid}), queryset.filter(**not_null)]
+    else:
+        parts = [_row_value(queryset, field, tiebreak, False, value, mid)]
+    return [_ordered(part, field, tiebreak, descending) for part in parts]
+
+
+class KeysetPage:
+    """Une page de résultats paginée par clé (sort, mid) plutôt que par OFFSET.
+
+    Chaque page coûte une requête de per_page + 1 lignes servie par l'index,
+    quelle que soit sa position dans le catalogue.
+    """
+
+    def __init__(self, queryset, field, descending, after=None, before=None, last=False, per_page=20, tiebreak='mid'):
+        self.per_page = per_page
+        self.field = field
+
+        queryset = queryset.annotate(sort_value=F(field))
+        # Page précédente et dernière page : on parcourt dans l'ordre inverse puis on retourne
+        reverse = bool(before) or last
+        scan_desc = descending != reverse
+        cursor = decode_cursor(before or after) if (before or after) else None
+
+        if cursor:
+            parts = cursor_querysets(queryset, field, tiebreak, scan_desc, *cursor)
+        else:
+            parts = [_ordered(queryset, field, tiebreak, scan_desc)]
+
+        # On ne passe au morceau suivant que si le précédent n'a pas rempli la page
+        rows = []
+        for part in parts:
+            rows += part[:per_page + 1 - len(rows)]
+            if len(rows) > per_page:
+                break
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if reverse:
+            rows.reverse()
+
+        self.object_list = rows
+        if reverse:
+            self.has_previous = has_more
+            self.has_next = not last
+        else:
+            self.has_previous = cursor is not None
+            self.has_next = has_more
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.object_list:
+            return None
+        row = self.object_list[-1]
+        return encode_cursor(row.sort_value, row.mid)
+
+    @property
+    def previous_cursor(self):
+        if not self.object_list:
+            return None
+        row = self.object_list[0]
+        return encode_cursor(row.sort_value, row.mid)
@@ -0,0 +1,176 @@
+import bisect
+import heapq
+import os
+import pickle
+import threading
+import time
+
+from django.conf import settings
+
+from .ids import MOVIE_PREFIX, PERSON_PREFIX, decode
+from .mongo_service import mongo_service
+from .text import tokenize
+
+# Au-delà de ce nombre d'entrées dans l'intervalle d'un préfixe, le top est pré-calculé
+RANGE_SCAN_LIMIT = 1000
+
+
+class PrefixIndex:
+    """Autocomplétion en mémoire : tableau trié de clés + bisect.
+
+    Chaque film ou personne est indexé sous son libellé normalisé et sous
+    chaque fin de libellé commençant par un mot ("destin d amelie" pour
+    "Le Fabuleux Destin d'Amélie"). Un préfixe correspond à un intervalle
+    contigu du tableau ; pour les préfixes dont l'intervalle dépasse
+    RANGE_SCAN_LIMIT entrées, le top est calculé à la construction.
+    """
+
+    def __init__(self, keys, refs, items, tops):
+        self.keys = keys      # clés triées
+        self.refs = refs      # refs[i] : indice dans items de la clé keys[i]
+        self.items = items    # dicts {kind, id, label, year, votes}
+        self.tops = tops      # {préfixe lourd: [indices dans items]}
+        self.generation = None  # génération de SEARCH_INDEX lue avant la construction
+
+    @classmethod
+    def build(cls, items, limit=10):
+        pairs = []
+        for i, item in enumerate(items):
+            words = tokenize(item['label'])
+            for start in range(len(words)):
+                pairs.append((' '.join(words[start:]), i))
+        pairs.sort()
+        keys = [k for k, _ in pairs]
+        refs = [i for _, i in pairs]
+
+        index = cls(keys, refs, items, {})
+        index.tops = index._compute_tops(limit)
+        return index
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def _best(self, lo, hi, limit):
+        # Plusieurs clés peuvent pointer vers le même film : on dédoublonne
+        best = heapq.nlargest(limit * 4, set(self.refs[lo:hi]), key=lambda i: self.items[i]['votes'])
+        return best[:limit]
+
+    def _compute_tops(self, limit):
+        tops = {}
+        # Un préfixe n'est lourd que si son préfixe plus court l'est aussi :
+        # on descend niveau par niveau à partir des préfixes d'un caractère.
+        candidates = {k[:1] for k in self.keys if k}
+        depth = 1
+        while candidates:
+            heavy = set()
+            for prefix in candidates:
+                lo, hi = self._range(prefix)
+                if hi - lo > RANGE_SCAN_LIMIT:
+                    tops[prefix] = self._best(lo, hi, limit)
+                    heavy.add(prefix)
+            depth += 1
+            candidates = set()
+            for prefix in heavy:
+                lo, hi = self._range(prefix)
+                candidates.update(k[:depth] for k in self.keys[lo:hi] if len(k) >= depth)
+        return tops
+
+    def lookup(self, text, limit=10):
+        prefix = ' '.join(tokenize(text))
+        if not prefix:
+            return []
+        if text[-1:].isspace():
+            prefix += ' '
+
+        if prefix in self.tops:
+            found = self.tops[prefix][:limit]
+        else:
+            lo, hi = self._range(prefix)
+            found = self._best(lo, hi, limit)
+        return [self.items[i] for i in found]
+
+
+def load_items(max_entries):
+    # Les plus populaires de chaque type, lus dans l'index de recherche (build_search_index.py)
+    items = []
+    for kind, id_field, prefix, label_field, year_field in [
+        ("movie", "mid", MOVIE_PREFIX, "primaryTitle", "startYear"),
+        ("person", "pid", PERSON_PREFIX, "primaryName", "birthYear"),
+    ]:
+        cursor = mongo_service.db.SEARCH_INDEX.find(
+            {"kind": kind}, {"_id": 0, id_field: 1, label_field: 1, year_field: 1, "votes": 1}
+        ).sort("votes", -1).limit(max_entries)
+        for doc in cursor:
+            items.append({
+                'kind': kind,
+                'id': decode(doc[id_field], prefix),
+                'label': doc.get(label_field) or '',
+                'year': doc.get(year_field),
+                'votes': doc.get('votes') or 0,
+            })
+    return items
+
+
+def search_index_generation():
+    # Incrémentée par build_search_index.py à chaque reconstruction de SEARCH_INDEX
+    return mongo_service.get_import_generations().get('SEARCH_INDEX', 0)
+
+
+def build_index(max_entries=None):
+    generation = search_index_generation()
+    index = PrefixIndex.build(load_items(max_entries or settings.AUTOCOMPLETE_MAX_ENTRIES))
+    index.generation = generation
+    return index
+
+
+def build_snapshot(path=None, max_entries=None):
+    path = path or settings.AUTOCOMPLETE_SNAPSHOT
+    index = build_index(max_entries)
+    with open(path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return index
+
+
+def load_snapshot(generation, path=None):
+    # None si le snapshot manque ou date d'une autre version de SEARCH_INDEX
+    path = path or settings.AUTOCOMPLETE_SNAPSHOT
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        index = pickle.load(f)
+    return index if getattr(index, 'generation', None) == generation else None
+
+
+_index = None
+_checked_at = 0
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Index du processus, gardé tant que la génération de SEARCH_INDEX ne change pas.
+
+    Chargé depuis le snapshot s'il est de la génération courante, sinon
+    construit depuis SEARCH_INDEX. Un index vide (SEARCH_INDEX absente ou
+    pas encore construite) n'est pas gardé : il est reconstruit à l'appel
+    suivant. La génération n'est relue qu'une fois toutes les
+    AUTOCOMPLETE_CHECK_INTERVAL secondes ; pendant une reconstruction, les
+    autres requêtes continuent d'utiliser l'index précédent.
+    """
+    global _index, _checked_at
+    if _index is not None and time.time() - _checked_at <= settings.AUTOCOMPLETE_CHECK_INTERVAL:
+        return _index
+
+    with _index_lock:
+        if _index is not None and time.time() - _checked_at <= settings.AUTOCOMPLETE_CHECK_INTERVAL:
+            return _index
+        generation = search_index_generation()
+        _checked_at = time.time()
+        if _index is not None and _index.generation == generation:
+            return _index
+
+        index = load_snapshot(generation) or build_index()
+        if index.items:
+            _index = index
+        return index
@@ -0,0 +1,76 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+from ..models import CatalogueFacet, MovieBrowse
+
+# Tris autorisés pour le catalogue (paramètre ?sort=) : (colonne, colonne de départage)
+SORT_FIELDS = {
+    'startyear': ('startyear', 'mid'),
+    'primarytitle': ('primarytitle', 'mid'),
+    'rating': ('averagerating', 'mid'),
+}
+
+
+def _filtered(queryset, year_min=None, year_max=None, rating_min=None):
+    # Le tri ne change pas l'ensemble des films : les non notés viennent en dernier (ou en premier).
+    # Même filtre sur MOVIE_BROWSE et sur CATALOGUE_FACETS, qui ont les mêmes colonnes.
+    if year_min:
+        queryset = queryset.filter(startyear__gte=year_min)
+    if year_max:
+        queryset = queryset.filter(startyear__lte=year_max)
+    if rating_min:
+        queryset = queryset.filter(averagerating__gte=rating_min)
+    return queryset
+
+
+def catalogue_queryset(genre=None, year_min=None, year_max=None, rating_min=None):
+    """Films du catalogue filtrés, lus dans MOVIE_BROWSE sans jointure.
+
+    Partagé par la vue et la vérification des index. Sans filtre de genre,
+    on ne garde que la ligne is_primary de chaque film pour ne pas le
+    répéter une fois par genre.
+    """
+    queryset = _filtered(MovieBrowse.objects.all(), year_min, year_max, rating_min)
+    if genre:
+        return queryset.filter(genre=genre)
+    return queryset.filter(is_primary=1)
+
+
+def catalogue_facets(genre=None, year_min=None, year_max=None, rating_min=None):
+    """Total et compteurs par genre et par décennie, en un seul GROUP BY.
+
+    Lus dans CATALOGUE_FACETS, précalculée à l'import : le GROUP BY ne
+    parcourt que les compteurs par (genre, année, note), pas MOVIE_BROWSE.
+    Les compteurs par genre ignorent le genre sélectionné (pour pouvoir en
+    changer) ; ceux par décennie et le total le respectent.
+    """
+    rows = (
+        _filtered(CatalogueFacet.objects.all(), year_min, year_max, rating_min)
+        .annotate(decade=F('startyear') / 10 * 10)
+        .values('genre', 'decade')
+        .annotate(total_n=Sum('n'), total_primary=Sum('n_primary'))
+    )
+
+    genres, decades = {}, {}
+    for row in rows:
+        if row['genre'] is not None:
+            genres[row['genre']] = genres.get(row['genre'], 0) + row['total_n']
+        count = (row['total_n'] if row['genre'] == genre else 0) if genre else row['total_primary']
+        if count:
+            decades[row['decade']] = decades.get(row['decade'], 0) + count
+
+    return {
+        'total': sum(decades.values()),
+        'genres': sorted(genres.items(), key=lambda g: -g[1]),
+        'decades': sorted((d, n) for d, n in decades.items() if d is not None),
+    }
+
+
+def cached_facets(**filters):
+    # Même sur CATALOGUE_FACETS, inutile de refaire le GROUP BY à chaque page d'un même filtre
+    key = 'catalogue-facets:' + hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    return cache.get_or_set(key, lambda: catalogue_facets(**filters), settings.CATALOGUE_COUNT_CACHE_TTL)
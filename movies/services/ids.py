@@ -0,0 +1,25 @@
+# Identifiants IMDb : 'tt0111161' pour un film, 'nm0000158' pour une personne.
+# Avec IMDB_ID_STORAGE = 'integer', SQLite et MongoDB n'en stockent que la
+# partie numérique (111161) ; le site continue de parler en 'tt...'.
+# Ce module n'utilise pas Django : les scripts d'import l'appellent aussi.
+
+MOVIE_PREFIX = 'tt'
+PERSON_PREFIX = 'nm'
+
+# Largeur minimale de la partie numérique (les identifiants récents en ont 8)
+WIDTH = 7
+
+
+def encode(value):
+    """'tt0111161' -> 111161. Une valeur qui n'a pas ce format est renvoyée telle quelle."""
+    if isinstance(value, str) and value[:2] in (MOVIE_PREFIX, PERSON_PREFIX) and value[2:].isdigit():
+        if decode(int(value[2:]), value[:2]) == value:
+            return int(value[2:])
+    return value
+
+
+def decode(value, prefix):
+    """111161 -> 'tt0111161'. Une valeur déjà textuelle (stockage 'text') est renvoyée telle quelle."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return f"{prefix}{value:0{WIDTH}d}"
+    return value
@@ -0,0 +1,72 @@
+# Index gérés pour les requêtes du catalogue.
+# Déclarés ici plutôt que créés à la main : la commande `python manage.py ensure_indexes`
+# les crée s'ils manquent et vérifie les plans d'exécution des requêtes chaudes.
+# Ce module n'utilise que sqlite3 pour pouvoir être appelé par les scripts d'import.
+
+MANAGED_PREFIX = 'idx_cat_'
+
+# (nom, table, colonnes) : la colonne filtrée d'abord (is_primary sans filtre de
+# genre, genre sinon), puis la colonne triée et mid pour le départage de la
+# pagination par clé. MOVIE_BROWSE porte déjà toutes les colonnes du catalogue.
+INDEXES = [
+    ('idx_cat_browse_primary_year', 'MOVIE_BROWSE', ['is_primary', 'startYear', 'mid']),
+    ('idx_cat_browse_primary_title', 'MOVIE_BROWSE', ['is_primary', 'primaryTitle', 'mid']),
+    ('idx_cat_browse_primary_rating', 'MOVIE_BROWSE', ['is_primary', 'averageRating', 'mid']),
+    ('idx_cat_browse_genre_year', 'MOVIE_BROWSE', ['genre', 'startYear', 'mid']),
+    ('idx_cat_browse_genre_title', 'MOVIE_BROWSE', ['genre', 'primaryTitle', 'mid']),
+    ('idx_cat_browse_genre_rating', 'MOVIE_BROWSE', ['genre', 'averageRating', 'mid']),
+]
+
+
+def existing_indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def ensure_indexes(conn, indexes=INDEXES):
+    """Crée les index déclarés absents de la base ; renvoie les noms créés.
+
+    Les tables pas encore construites (MOVIE_BROWSE avant le premier
+    rebuild_movie_browse) sont ignorées.
+    """
+    present = existing_indexes(conn)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    created = []
+    for name, table, columns in indexes:
+        if name not in present and table in tables:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+            created.append(name)
+    if created:
+        conn.execute("ANALYZE")
+    conn.commit()
+    return created
+
+
+def explain(conn, sql, params=()):
+    # conn : connexion sqlite3 ou connexion Django (mêmes méthodes cursor/execute)
+    cursor = conn.cursor()
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return [row[-1] for row in cursor.fetchall()]
+
+
+def temp_sorts(plan):
+    return [step for step in plan if 'TEMP B-TREE' in step]
+
+
+def seeks_on(plan, column):
+    # Une étape SEARCH dont les contraintes d'index portent sur column, ex. (is_primary=? AND (startYear,mid)<(?,?))
+    return any(step.startswith('SEARCH') and column in step.partition('(')[2] for step in plan)
+
+
+def full_scans(plan):
+    """Étapes du plan qui lisent une table entière.
+
+    Un SCAN sans index lit toute la table ; un SCAN sur un index n'est
+    acceptable que s'il fournit directement l'ordre demandé (pas de tri
+    temporaire), le LIMIT arrêtant alors le parcours au bout de 21 lignes.
+    """
+    sorted_afterwards = bool(temp_sorts(plan))
+    return [
+        step for step in plan
+        if step.startswith('SCAN') and 'CONSTANT ROW' not in step
+        and ('INDEX' not in step or sorted_afterwards)
+    ]
@@ -0,0 +1,161 @@
+import json
+import time
+
+from .index_manager import INDEXES, ensure_indexes
+
+# Tables matérialisées construites à partir de imdb.db.
+# Ce module n'utilise que sqlite3 : il est appelé aussi bien par les commandes
+# Django que par les scripts d'import (scripts/phase1_sqlite/import_data.py).
+
+
+def compute_dashboard_stats(conn, top_n=10, min_votes=10000):
+    cur = conn.cursor()
+
+    total_films = cur.execute("SELECT COUNT(*) FROM MOVIE").fetchone()[0]
+    total_acteurs = cur.execute(
+        "SELECT COUNT(*) FROM PROFESSION WHERE jobName LIKE '%actor%'"
+    ).fetchone()[0]
+    total_producteurs = cur.execute(
+        "SELECT COUNT(*) FROM PROFESSION WHERE jobName LIKE '%producer%'"
+    ).fetchone()[0]
+
+    cur.execute("""
+        SELECT m.mid, m.primaryTitle, r.averageRating
+        FROM RATING r JOIN MOVIE m ON m.mid = r.mid
+        WHERE r.numVotes > ?
+        ORDER BY r.averageRating DESC
+        LIMIT ?
+    """, (min_votes, top_n))
+    top_movies = [
+        {'mid': mid, 'primarytitle': title, 'averagerating': rating}
+        for mid, title, rating in cur.fetchall()
+    ]
+
+    return {
+        'total_films': total_films,
+        'total_acteurs': total_acteurs,
+        'total_producteurs': total_producteurs,
+        'top_movies': top_movies,
+    }
+
+
+def refresh_dashboard_stats(conn, top_n=10, min_votes=10000):
+    stats = compute_dashboard_stats(conn, top_n, min_votes)
+    stats['refreshed_at'] = time.time()
+
+    conn.execute("CREATE TABLE IF NOT EXISTS DASHBOARD_STATS (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany(
+        "INSERT OR REPLACE INTO DASHBOARD_STATS (key, value) VALUES (?, ?)",
+        [(key, json.dumps(value)) for key, value in stats.items()]
+    )
+    conn.commit()
+    return stats
+
+
+def rebuild_movie_browse(conn):
+    """Reconstruit MOVIE_BROWSE : une ligne par (film, genre), note comprise.
+
+    Le catalogue filtre et trie sur cette seule table au lieu de joindre
+    MOVIE, GENRE et RATING à chaque page. is_primary marque une ligne par
+    film (son premier genre, ou la ligne sans genre) pour lister les films
+    sans doublon quand aucun genre n'est choisi. mid n'a pas de type
+    déclaré pour garder tel quel le texte ou l'entier de MOVIE (--integer-ids).
+    """
+    conn.execute("DROP TABLE IF EXISTS MOVIE_BROWSE")
+    conn.execute("""
+        CREATE TABLE MOVIE_BROWSE (
+            mid NOT NULL,
+            genre TEXT,
+            is_primary INTEGER NOT NULL,
+            primaryTitle TEXT,
+            titleType TEXT,
+            startYear INTEGER,
+            averageRating REAL,
+            numVotes INTEGER
+        )
+    """)
+    conn.execute("""
+        INSERT INTO MOVIE_BROWSE
+        SELECT m.mid, g.genre,
+               CASE WHEN g.genre IS NULL
+                      OR g.genre = (SELECT MIN(g2.genre) FROM GENRE g2 WHERE g2.mid = m.mid)
+                    THEN 1 ELSE 0 END,
+               m.primaryTitle, m.titleType, m.startYear, r.averageRating, r.numVotes
+        FROM MOVIE m
+        LEFT JOIN GENRE g ON g.mid = m.mid
+        LEFT JOIN RATING r ON r.mid = m.mid
+    """)
+    # DROP TABLE a supprimé les index : on les recrée avant ANALYZE
+    ensure_indexes(conn, [index for index in INDEXES if index[1] == 'MOVIE_BROWSE'])
+    rebuild_catalogue_facets(conn)
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM MOVIE_BROWSE").fetchone()[0]
+
+
+def rebuild_catalogue_facets(conn):
+    """Reconstruit CATALOGUE_FACETS : les lignes de MOVIE_BROWSE comptées par (genre, année, note).
+
+    Les filtres du catalogue portent sur l'année et la note minimale, qui
+    sont des colonnes de cette table : les compteurs par genre et par
+    décennie de n'importe quel filtre en sont des sommes exactes, sur
+    quelques dizaines de milliers de lignes au lieu de toute MOVIE_BROWSE.
+    """
+    conn.execute("DROP TABLE IF EXISTS CATALOGUE_FACETS")
+    conn.execute("""
+        CREATE TABLE CATALOGUE_FACETS (
+            genre TEXT,
+            startYear INTEGER,
+            averageRating REAL,
+            n INTEGER NOT NULL,
+            n_primary INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO CATALOGUE_FACETS
+        SELECT genre, startYear, averageRating, COUNT(*), SUM(is_primary)
+        FROM MOVIE_BROWSE
+        GROUP BY genre, startYear, averageRating
+    """)
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM CATALOGUE_FACETS").fetchone()[0]
+
+
+def bump_import_generation(conn):
+    """Incrémente le numéro de génération de la base, à appeler en fin d'import.
+
+    Les caches mémoire du site (movies/services/reference_data.py) le relisent
+    pour savoir que les données ont changé.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS IMPORT_META (key TEXT PRIMARY KEY, value INTEGER)")
+    conn.execute("INSERT OR IGNORE INTO IMPORT_META (key, value) VALUES ('generation', 0)")
+    conn.execute("UPDATE IMPORT_META SET value = value + 1 WHERE key = 'generation'")
+    conn.commit()
+    return conn.execute("SELECT value FROM IMPORT_META WHERE key = 'generation'").fetchone()[0]
+
+
+def user_tables(conn):
+    return [
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )
+    ]
+
+
+def refresh_row_counts(conn, tables=None):
+    """Compte exactement les lignes de chaque table et les range dans ROW_COUNTS.
+
+    Appelé en fin d'import : les COUNT(*) sur des dizaines de millions de
+    lignes sont payés une fois ici plutôt qu'à chaque affichage.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS ROW_COUNTS (table_name TEXT PRIMARY KEY, row_count INTEGER, counted_at REAL)")
+    if tables is None:
+        tables = [table for table in user_tables(conn) if table != 'ROW_COUNTS']
+
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+    now = time.time()
+    conn.executemany(
+        "INSERT OR REPLACE INTO ROW_COUNTS (table_name, row_count, counted_at) VALUES (?, ?, ?)",
+        [(table, count, now) for table, count in counts.items()]
+    )
+    conn.commit()
+    return counts
@@ -1,11 +1,17 @@
 from pymongo import MongoClient
 from django.conf import settings
 
+from ..fields import db_id
+from .ids import MOVIE_PREFIX, decode
+from .lru import LRUCache
+
 class MongoService:
     def __init__(self):
 
         self.client = MongoClient(settings.MONGO_URI)
         self.db = self.client[settings.MONGO_DB_NAME]
+        # Les noms de personnes ne changent quasiment jamais : on les garde en mémoire
+        self._person_names = LRUCache(settings.PERSON_NAME_CACHE_SIZE)
 
     def get_movie_by_id(self, tconst):
         return self.db.MOVIE.find_one({"tconst": tconst})
@@ -16,4 +22,66 @@ class MongoService:
     def get_movies_by_genre(self, genre):
         return list(self.db.MOVIE.find({"genres": {"$regex": genre, "$options": "i"}}).limit(20))
 
-mongo_service = MongoService()
\ No newline at end of file
+    def get_movie_complete(self, mid):
+        return self.db.MOVIE_COMPLETE.find_one({"_id": db_id(mid)})
+
+    def get_similars(self, mid):
+        # Liste pré-calculée par scripts/phase2_mongodb/compute_similars.py (None si absente)
+        doc = self.db.SIMILAR.find_one({"_id": db_id(mid)})
+        if not doc:
+            return None
+        return [dict(similar, mid=decode(similar['mid'], MOVIE_PREFIX)) for similar in doc['similars']]
+
+    def get_person_complete(self, pid):
+        # Filmographie pré-calculée par scripts/phase2_mongodb/build_person_complete.py (None si absente)
+        doc = self.db.PERSON_COMPLETE.find_one({"_id": db_id(pid)})
+        if doc:
+            for credit in doc['credits']:
+                credit['mid'] = decode(credit['mid'], MOVIE_PREFIX)
+        return doc
+
+    def get_import_generations(self):
+        # {collection: génération}, incrémenté par les scripts de migration à chaque import
+        doc = self.db.META.find_one({"_id": "import_generation"})
+        return doc.get('collections', {}) if doc else {}
+
+    def get_person_names(self, pids):
+        # {pid: primaryName} en une seule requête $in pour les pids absents du cache
+        pids = set(pids)
+        names = self._person_names.get_many(pids)
+        missing = pids - names.keys()
+        if missing:
+            fetched = {
+                p['pid']: p.get('primaryName')
+                for p in self.db.PERSON.find({"pid": {"$in": list(missing)}}, {"_id": 0, "pid": 1, "primaryName": 1})
+            }
+            self._person_names.set_many(fetched)
+            names.update(fetched)
+        return names
+
+    def get_full_cast(self, mid):
+        # 3 requêtes quelle que soit la taille du casting (au lieu de 2 par principal)
+        mid = db_id(mid)
+        principals = list(self.db.PRINCIPAL.find(
+            {"mid": mid}, {"_id": 0, "pid": 1, "category": 1}
+        ).sort("ordering", 1))
+        if not principals:
+            return []
+
+        persons = self.get_person_names(p['pid'] for p in principals)
+
+        # On garde le premier personnage trouvé par personne (comme l'ancien find_one)
+        characters = {}
+        for c in self.db.CHARACTER.find({"mid": mid}, {"_id": 0, "pid": 1, "name": 1}):
+            characters.setdefault(c['pid'], c.get('name'))
+
+        return [
+            {
+                'name': persons[p['pid']],
+                'category': p.get('category'),
+                'character': characters.get(p['pid']),
+            }
+            for p in principals if p['pid'] in persons
+        ]
+
+mongo_service = MongoService()
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .sqlite_service import sqlite_service
+
+# Listes de faible cardinalité affichées dans les formulaires : nom -> (chargeur, colonne)
+LOADERS = {
+    'genres': (sqlite_service.get_all_genres, 'genre'),
+    'title_types': (sqlite_service.get_title_types, 'titleType'),
+    'categories': (sqlite_service.get_categories, 'category'),
+}
+
+
+class ReferenceData:
+    """Cache mémoire des listes de référence (genres, types de titre, catégories).
+
+    Chaque liste est lue une fois par processus puis gardée tant que la
+    génération d'import de la base (table IMPORT_META, incrémentée à la fin
+    de import_data.py) ne change pas. La génération n'est relue qu'une fois
+    toutes les REFERENCE_DATA_CHECK_INTERVAL secondes.
+    """
+
+    def __init__(self, check_interval=None):
+        self.check_interval = check_interval if check_interval is not None else settings.REFERENCE_DATA_CHECK_INTERVAL
+        self._values = {}
+        self._generation = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _check_generation(self):
+        now = time.time()
+        if now - self._checked_at <= self.check_interval:
+            return
+        self._checked_at = now
+        generation = sqlite_service.get_import_generation()
+        if generation != self._generation:
+            self._values = {}
+            self._generation = generation
+
+    def get(self, name):
+        self._check_generation()
+        values = self._values.get(name)
+        if values is not None:
+            return values
+
+        with self._lock:
+            values = self._values.get(name)
+            if values is None:
+                loader, column = LOADERS[name]
+                values = [row[column] for row in loader()]
+                self._values[name] = values
+            return values
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+            self._checked_at = 0
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+from array import array
+
+from django.conf import settings
+
+from .ids import MOVIE_PREFIX, decode
+from .sqlite_service import sqlite_service
+
+
+class RandomMovieSampler:
+    """Tirage de N films au hasard en O(N), sans ORDER BY RANDOM().
+
+    Sans filtre, on tire des rowids dans [MIN(rowid), MAX(rowid)] et on
+    recommence (nombre d'essais borné) si on tombe dans des trous.
+    Avec filtres (titleType, nombre de votes), on garde en mémoire le
+    tableau dense des rowids qui les respectent, construit une seule fois
+    par combinaison de filtres. Ces caches sont vidés quand la génération
+    d'import change (les rowids ne sont plus les mêmes), vérifiée au plus
+    une fois toutes les REFERENCE_DATA_CHECK_INTERVAL secondes.
+    """
+
+    def __init__(self, service=sqlite_service, max_tries=5, check_interval=None):
+        self.service = service
+        self.max_tries = max_tries
+        self.check_interval = check_interval if check_interval is not None else settings.REFERENCE_DATA_CHECK_INTERVAL
+        self._rowid_range = None
+        self._dense_ids = {}
+        self._generation = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _check_generation(self):
+        now = time.time()
+        if now - self._checked_at <= self.check_interval:
+            return
+        self._checked_at = now
+        generation = self.service.get_import_generation()
+        if generation != self._generation:
+            with self._lock:
+                self._rowid_range = None
+                self._dense_ids = {}
+                self._generation = generation
+
+    def sample(self, n, title_type=None, min_votes=None):
+        self._check_generation()
+        if title_type is None and min_votes is None:
+            return self._sample_range(n)
+        return self._sample_dense(n, title_type, min_votes)
+
+    def _fetch(self, rowids):
+        placeholders = ','.join('?' * len(rowids))
+        query = f"""
+            SELECT mid, primaryTitle AS primarytitle, startYear AS startyear
+            FROM MOVIE WHERE rowid IN ({placeholders})
+        """
+        rows = self.service._execute_query(query, list(rowids))
+        for row in rows:
+            row['mid'] = decode(row['mid'], MOVIE_PREFIX)
+        return rows
+
+    def _get_rowid_range(self):
+        if self._rowid_range is None:
+            row = self.service._execute_query("SELECT MIN(rowid) AS lo, MAX(rowid) AS hi FROM MOVIE")[0]
+            self._rowid_range = (row['lo'], row['hi'])
+        return self._rowid_range
+
+    def _sample_range(self, n):
+        lo, hi = self._get_rowid_range()
+        if lo is None:
+            return []
+
+        movies = {}
+        tried = set()
+        for _ in range(self.max_tries):
+            missing = n - len(movies)
+            remaining = (hi - lo + 1) - len(tried)
+            if missing <= 0 or remaining <= 0:
+                break
+
+            rowids = set()
+            while len(rowids) < min(missing * 2, remaining):
+                rowid = random.randint(lo, hi)
+                if rowid not in tried:
+                    rowids.add(rowid)
+            tried |= rowids
+
+            for row in self._fetch(rowids):
+                if len(movies) < n:
+                    movies[row['mid']] = row
+
+        result = list(movies.values())
+        random.shuffle(result)
+        return result
+
+    def _get_dense_ids(self, title_type, min_votes):
+        key = (title_type, min_votes)
+        ids = self._dense_ids.get(key)
+        if ids is None:
+            with self._lock:
+                ids = self._dense_ids.get(key)
+                if ids is None:
+                    query = "SELECT m.rowid AS id FROM MOVIE m"
+                    conditions, params = [], []
+                    if min_votes is not None:
+                        query += " JOIN RATING r ON r.mid = m.mid"
+                        conditions.append("r.numVotes > ?")
+                        params.append(min_votes)
+                    if title_type is not None:
+                        conditions.append("m.titleType = ?")
+                        params.append(title_type)
+                    query += " WHERE " + " AND ".join(conditions)
+
+                    ids = array('q', (row['id'] for row in self.service._execute_query(query, params)))
+                    self._dense_ids[key] = ids
+        return ids
+
+    def _sample_dense(self, n, title_type, min_votes):
+        ids = self._get_dense_ids(title_type, min_votes)
+        if not ids:
+            return []
+
+        positions = random.sample(range(len(ids)), min(n, len(ids)))
+        rows = {row['mid']: row for row in self._fetch([ids[i] for i in positions])}
+        result = list(rows.values())
+        random.shuffle(result)
+        return result
+
+
+movie_sampler = RandomMovieSampler()
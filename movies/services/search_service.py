@@ -0,0 +1,80 @@
+from .ids import MOVIE_PREFIX, PERSON_PREFIX, decode
+from .mongo_service import mongo_service
+from .text import tokenize
+
+# Les préfixes plus courts sont cherchés comme des mots entiers :
+# un préfixe d'une lettre couvrirait une grande partie de l'index.
+MIN_PREFIX_LENGTH = 2
+
+# Mots complets essayés pour un début de mot (les plus populaires de SEARCH_TOKENS).
+# Sous la limite de MongoDB (200 valeurs) pour qu'un $in reste trié par l'index.
+MAX_EXPANSIONS = 50
+
+
+class SearchService:
+    """Recherche de films et de personnes sur la collection SEARCH_INDEX.
+
+    Tous les mots de la requête doivent apparaître, le dernier pouvant
+    n'être qu'un début de mot ; les résultats sont classés par numVotes.
+
+    Chaque requête est une égalité (ou un $in borné) sur tokens : l'index
+    (kind, tokens, votes) rend les documents déjà triés par votes et la
+    requête s'arrête après limit documents, sans tri en mémoire.
+    """
+
+    def __init__(self, service=mongo_service):
+        self.db = service.db
+
+    def is_available(self):
+        return self.db.SEARCH_INDEX.find_one({}, {"_id": 1}) is not None
+
+    def _query(self, kind, text, limit):
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+
+        *words, last = tokens
+        conditions = [{"tokens": word} for word in words]
+
+        # D'abord le dernier mot tel quel, puis ses complétions pour compléter la liste
+        results = self._find(kind, conditions + [{"tokens": last}], limit)
+        if len(results) < limit and len(last) >= MIN_PREFIX_LENGTH:
+            expansions = [token for token in self._expand(kind, last) if token != last]
+            if expansions:
+                found = {doc["_id"] for doc in results}
+                more = self._find(kind, conditions + [{"tokens": {"$in": expansions}}], limit)
+                results += [doc for doc in more if doc["_id"] not in found][:limit - len(results)]
+
+        for doc in results:
+            if 'mid' in doc:
+                doc['mid'] = decode(doc['mid'], MOVIE_PREFIX)
+            if 'pid' in doc:
+                doc['pid'] = decode(doc['pid'], PERSON_PREFIX)
+        return results
+
+    def _find(self, kind, conditions, limit):
+        return list(
+            self.db.SEARCH_INDEX.find({"kind": kind, "$and": conditions}, {"tokens": 0})
+            .sort("votes", -1)
+            .limit(limit)
+        )
+
+    def _expand(self, kind, prefix):
+        # Intervalle de l'_id de SEARCH_TOKENS : le tri par votes ne porte que sur les mots
+        # distincts qui commencent par le préfixe, pas sur les documents qui les contiennent
+        key = f"{kind}:{prefix}"
+        cursor = (
+            self.db.SEARCH_TOKENS.find({"_id": {"$gte": key, "$lt": key + "\uffff"}})
+            .sort("votes", -1)
+            .limit(MAX_EXPANSIONS)
+        )
+        return [doc["_id"].split(":", 1)[1] for doc in cursor]
+
+    def search_movies(self, text, limit=10):
+        return self._query("movie", text, limit)
+
+    def search_persons(self, text, limit=10):
+        return self._query("person", text, limit)
+
+
+search_service = SearchService()
@@ -1,40 +1,177 @@
+import os
 import sqlite3
+import json
+import threading
+from contextlib import contextmanager
 from django.conf import settings
 
+from .ids import MOVIE_PREFIX, decode
+from .materialize import compute_dashboard_stats
+
+# Réglages appliqués à chaque connexion à son ouverture
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",       # lectures non bloquées pendant un import
+    "PRAGMA mmap_size = 268435456",    # 256 Mo lus via mmap plutôt que par read()
+    "PRAGMA cache_size = -65536",      # 64 Mo de cache de pages par connexion
+    "PRAGMA temp_store = MEMORY",      # tris et tables temporaires en mémoire
+]
+
+# Nombre de requêtes préparées gardées par connexion (cache de sqlite3)
+CACHED_STATEMENTS = 256
+
+# Connexions inactives gardées ouvertes au maximum
+POOL_SIZE = 8
+
+
 class SQLiteService:
-    def __init__(self):
-        self.db_path = settings.DATABASES['default']['NAME']
+    """Accès direct à imdb.db à travers un petit pool de connexions persistantes.
 
-    def _execute_query(self, query, params=()):
-        
-        conn = sqlite3.connect(self.db_path)
+    Ouvrir une connexion coûte l'ouverture du fichier, la lecture du schéma
+    et un cache de pages vide : les connexions sont donc réglées une fois
+    (PRAGMAS) puis rendues au pool après chaque requête, et sqlite3 y
+    réutilise les requêtes déjà préparées. Une connexion n'est utilisée que
+    par un thread à la fois ; le serveur de développement crée un thread par
+    requête HTTP, d'où un pool partagé plutôt qu'une connexion par thread.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or settings.DATABASES['default']['NAME']
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _file_id(self):
+        # Un import recrée imdb.db (os.remove puis nouvelle base) : l'inode change
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
 
-        cursor = conn.cursor()
+    @contextmanager
+    def connection(self):
+        # Les connexions ouvertes sur un ancien fichier liraient encore la base supprimée : on les ferme
+        file_id = self._file_id()
+        with self._lock:
+            stale = [conn for conn, opened_on in self._idle if opened_on != file_id]
+            self._idle = [(conn, opened_on) for conn, opened_on in self._idle if opened_on == file_id]
+            conn = self._idle.pop()[0] if self._idle else None
+        for old in stale:
+            old.close()
+        if conn is None:
+            conn = self._connect()
         try:
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+            yield conn
         finally:
+            with self._lock:
+                if len(self._idle) < POOL_SIZE:
+                    self._idle.append((conn, file_id))
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close_all(self):
+        # Ferme les connexions inactives (fin de processus, bascule de base)
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
             conn.close()
 
+    def _execute_query(self, query, params=()):
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            try:
+                return [dict(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
     def get_all_genres(self):
+        # Requête brute : les pages passent par reference_data.get('genres'), mis en cache
         query = "SELECT DISTINCT genre FROM GENRE ORDER BY genre ASC"
         return self._execute_query(query)
 
+    def get_title_types(self):
+        query = "SELECT DISTINCT titleType FROM MOVIE WHERE titleType IS NOT NULL ORDER BY titleType ASC"
+        return self._execute_query(query)
+
+    def get_categories(self):
+        query = "SELECT DISTINCT category FROM PRINCIPAL WHERE category IS NOT NULL ORDER BY category ASC"
+        return self._execute_query(query)
 
-    def get_all_counts(self):
+    def get_import_generation(self):
+        # Incrémenté par scripts/phase1_sqlite/import_data.py à la fin de chaque import
+        try:
+            rows = self._execute_query("SELECT value FROM IMPORT_META WHERE key = 'generation'")
+        except sqlite3.OperationalError:
+            return 0
+        return rows[0]['value'] if rows else 0
+
+
+    def _exact_count(self, table):
+        try:
+            res = self._execute_query(f"SELECT COUNT(*) as cnt FROM {table}")
+            return res[0]['cnt'] if res else 0
+        except Exception as e:
+            print(f"Erreur lors du comptage de la table {table}: {e}")
+            return 0
+
+    def _estimated_counts(self):
+        # Compteurs tenus par l'import (ROW_COUNTS), complétés par les statistiques
+        # d'ANALYZE : le premier entier de sqlite_stat1.stat est le nombre de lignes estimé
+        estimates = {}
+        try:
+            for row in self._execute_query("SELECT tbl, stat FROM sqlite_stat1"):
+                rows = int(row['stat'].split()[0])
+                estimates[row['tbl']] = max(rows, estimates.get(row['tbl'], 0))
+        except sqlite3.OperationalError:
+            pass
+        try:
+            for row in self._execute_query("SELECT table_name, row_count FROM ROW_COUNTS"):
+                estimates[row['table_name']] = row['row_count']
+        except sqlite3.OperationalError:
+            pass
+        return estimates
+
+    def get_all_counts(self, exact=False):
+        """Nombre de lignes des tables principales.
+
+        Par défaut, lu dans ROW_COUNTS (ou estimé par sqlite_stat1) sans
+        parcourir les tables ; exact=True refait les COUNT(*). Une table sans
+        compteur ni statistique est comptée exactement.
+        """
         tables = ['CHARACTER', 'DIRECTOR', 'EPISODE', 'GENRE', 'MOVIE', 'PERSON']
+        estimates = {} if exact else self._estimated_counts()
+
         counts = {}
-        
         for table in tables:
-            try:
-                query = f"SELECT COUNT(*) as cnt FROM {table}"
-                res = self._execute_query(query)
-                counts[table] = res[0]['cnt'] if res else 0
-            except Exception as e:
-                print(f"Erreur lors du comptage de la table {table}: {e}")
-                counts[table] = 0
-                
+            if table in estimates:
+                counts[table] = estimates[table]
+            else:
+                counts[table] = self._exact_count(table)
+
         return counts
 
+    def get_dashboard_stats(self):
+        try:
+            rows = self._execute_query("SELECT key, value FROM DASHBOARD_STATS")
+        except sqlite3.OperationalError:
+            rows = []
+
+        if rows:
+            stats = {row['key']: json.loads(row['value']) for row in rows}
+        else:
+            # Table pas encore matérialisée (python manage.py refresh_dashboard) : calcul à la volée
+            with self.connection() as conn:
+                stats = compute_dashboard_stats(conn)
+
+        for movie in stats['top_movies']:
+            movie['mid'] = decode(movie['mid'], MOVIE_PREFIX)
+        return stats
+
 sqlite_service = SQLiteService()
\ No newline at end of file
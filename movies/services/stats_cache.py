@@ -0,0 +1,57 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .mongo_service import mongo_service
+
+
+class StatsCache:
+    """Cache mémoire des agrégations de la page statistiques.
+
+    Chaque résultat est stocké avec la version des collections dont il
+    dépend (compteur de génération tenu dans la collection META et
+    incrémenté par les scripts de migration). Il n'est recalculé que si
+    l'une de ces collections a été réimportée, ou après STATS_CACHE_TTL
+    secondes par sécurité. Les compteurs ne sont relus dans META qu'une
+    fois toutes les STATS_CACHE_CHECK_INTERVAL secondes.
+    """
+
+    def __init__(self, ttl=None, check_interval=None):
+        self.ttl = ttl if ttl is not None else settings.STATS_CACHE_TTL
+        self.check_interval = check_interval if check_interval is not None else settings.STATS_CACHE_CHECK_INTERVAL
+        self._entries = {}
+        self._generations = {}
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _versions(self, collections):
+        now = time.time()
+        if now - self._checked_at > self.check_interval:
+            self._generations = mongo_service.get_import_generations()
+            self._checked_at = now
+        return tuple(self._generations.get(c, 0) for c in collections)
+
+    def get(self, name, collections, compute):
+        version = self._versions(collections)
+        entry = self._entries.get(name)
+        if entry and entry['version'] == version and time.time() - entry['computed_at'] < self.ttl:
+            return entry['value']
+
+        # Un seul recalcul à la fois : les requêtes concurrentes attendent le résultat
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry['version'] == version and time.time() - entry['computed_at'] < self.ttl:
+                return entry['value']
+
+            value = compute()
+            self._entries[name] = {'value': value, 'version': version, 'computed_at': time.time()}
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._checked_at = 0
+
+
+stats_cache = StatsCache()
@@ -0,0 +1,18 @@
+import re
+import unicodedata
+
+# Normalisation commune à l'index de recherche et à l'autocomplétion :
+# minuscules, sans accents, découpé sur tout ce qui n'est pas alphanumérique.
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
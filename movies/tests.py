@@ -1,3 +1,231 @@
-from django.test import TestCase
+import base64
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .fields import db_id
+from .pagination import KeysetPage, decode_cursor, encode_cursor
+from .services.autocomplete import PrefixIndex
+from .services.catalogue import SORT_FIELDS, catalogue_facets, catalogue_queryset
+from .services.ids import MOVIE_PREFIX, PERSON_PREFIX, decode, encode
+from .services.lru import LRUCache
+from .services.materialize import rebuild_movie_browse
+
+
+def _movies():
+    # 40 films avec des années, notes et titres en double, et des NULL pour chaque clé de tri
+    movies = []
+    for i in range(1, 41):
+        movies.append({
+            'mid': f'tt{i:07d}',
+            'primarytitle': f'Film {i % 7}',
+            'startyear': None if i % 9 == 0 else 1990 + i % 5 * 4,
+            'averagerating': None if i % 4 == 0 else 5.5 + i % 6,
+            'genres': [[], ['Drama'], ['Comedy', 'Drama']][i % 3],
+        })
+    return movies
+
+
+class CatalogueTestCase(TestCase):
+    """Pagination par clé et compteurs du catalogue, sur un MOVIE_BROWSE construit pour le test."""
+
+    movies = _movies()
+
+    @classmethod
+    def setUpClass(cls):
+        # Tables non gérées par Django : créées avant la transaction du TestCase
+        connection.ensure_connection()
+        conn = connection.connection
+        conn.execute("CREATE TABLE MOVIE (mid TEXT PRIMARY KEY, primaryTitle TEXT, titleType TEXT, startYear INTEGER)")
+        conn.execute("CREATE TABLE GENRE (mid TEXT, genre TEXT)")
+        conn.execute("CREATE TABLE RATING (mid TEXT, averageRating REAL, numVotes INTEGER)")
+        for movie in cls.movies:
+            conn.execute("INSERT INTO MOVIE VALUES (?, ?, 'movie', ?)",
+                         (movie['mid'], movie['primarytitle'], movie['startyear']))
+            conn.executemany("INSERT INTO GENRE VALUES (?, ?)", [(movie['mid'], g) for g in movie['genres']])
+            if movie['averagerating'] is not None:
+                conn.execute("INSERT INTO RATING VALUES (?, ?, 100)", (movie['mid'], movie['averagerating']))
+        rebuild_movie_browse(conn)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for table in ('MOVIE', 'GENRE', 'RATING', 'MOVIE_BROWSE', 'CATALOGUE_FACETS'):
+            connection.connection.execute(f"DROP TABLE {table}")
+
+    def expected(self, field, descending, genre=None):
+        # Ordre de SQLite : NULL avant toute valeur, départage par mid
+        movies = [m for m in self.movies if genre is None or genre in m['genres']]
+        movies.sort(key=lambda m: (m[field] is not None, m[field] if m[field] is not None else 0, m['mid']))
+        if descending:
+            movies.reverse()
+        return [m['mid'] for m in movies]
+
+    def test_cursor_round_trip(self):
+        for value in (1994, 7.5, 'Film 3', None):
+            self.assertEqual(decode_cursor(encode_cursor(value, 'tt0000012')), (value, 'tt0000012'))
+
+    def test_tampered_cursor_is_rejected(self):
+        def forge(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        for cursor in ('', 'pas-un-curseur', forge({'value': 1}), forge([1, 2, 3]), forge([True, 'tt0000001']),
+                       forge([1994, 12]), forge([[1994], 'tt0000001']), forge([{'a': 1}, 'tt0000001'])):
+            self.assertIsNone(decode_cursor(cursor), cursor)
+
+    def test_keyset_pages_forward(self):
+        for genre in (None, 'Drama'):
+            for sort_by, (field, _) in SORT_FIELDS.items():
+                for descending in (False, True):
+                    queryset = catalogue_queryset(genre=genre)
+                    page = KeysetPage(queryset, field, descending, per_page=7)
+                    self.assertFalse(page.has_previous)
+                    mids = [row.mid for row in page]
+                    while page.has_next:
+                        page = KeysetPage(queryset, field, descending, after=page.next_cursor, per_page=7)
+                        mids += [row.mid for row in page]
+                    self.assertEqual(mids, self.expected(field, descending, genre), (genre, sort_by, descending))
+
+    def test_keyset_pages_backward(self):
+        for genre in (None, 'Drama'):
+            for sort_by, (field, _) in SORT_FIELDS.items():
+                for descending in (False, True):
+                    queryset = catalogue_queryset(genre=genre)
+                    page = KeysetPage(queryset, field, descending, last=True, per_page=7)
+                    self.assertFalse(page.has_next)
+                    mids = [row.mid for row in page]
+                    while page.has_previous:
+                        page = KeysetPage(queryset, field, descending, before=page.previous_cursor, per_page=7)
+                        mids = [row.mid for row in page] + mids
+                    self.assertEqual(mids, self.expected(field, descending, genre), (genre, sort_by, descending))
+
+    def test_facets_match_brute_force_counts(self):
+        filters = [
+            {},
+            {'genre': 'Drama'},
+            {'year_min': 1994, 'year_max': 2002},
+            {'rating_min': 7},
+            {'genre': 'Comedy', 'year_min': 1998, 'rating_min': 6.5},
+        ]
+        for selected in filters:
+            def matches(movie):
+                year, rating = movie['startyear'], movie['averagerating']
+                if selected.get('year_min') and (year is None or year < selected['year_min']):
+                    return False
+                if selected.get('year_max') and (year is None or year > selected['year_max']):
+                    return False
+                return not selected.get('rating_min') or (rating is not None and rating >= selected['rating_min'])
+
+            movies = [m for m in self.movies if matches(m)]
+            listed = [m for m in movies if 'genre' not in selected or selected['genre'] in m['genres']]
+            genres, decades = {}, {}
+            for movie in movies:
+                for genre in movie['genres']:
+                    genres[genre] = genres.get(genre, 0) + 1
+            for movie in listed:
+                if movie['startyear'] is not None:
+                    decade = movie['startyear'] // 10 * 10
+                    decades[decade] = decades.get(decade, 0) + 1
+
+            facets = catalogue_facets(**selected)
+            self.assertEqual(facets['total'], len(listed), selected)
+            self.assertEqual(dict(facets['genres']), genres, selected)
+            self.assertEqual(dict(facets['decades']), decades, selected)
+
+
+class PrefixIndexTestCase(SimpleTestCase):
+    """Autocomplétion : préfixes légers (parcours de l'intervalle) et lourds (top pré-calculé)."""
+
+    def setUp(self):
+        self.items = [
+            {'kind': 'movie', 'id': f'tt{i:07d}', 'label': f'Star {i}', 'year': 2000, 'votes': i * 7 % 31}
+            for i in range(1, 31)
+        ] + [
+            {'kind': 'movie', 'id': 'tt0211915', 'label': "Le Fabuleux Destin d'Amélie Poulain", 'year': 2001, 'votes': 50},
+            {'kind': 'person', 'id': 'nm0000001', 'label': 'Stanley Kubrick', 'year': 1928, 'votes': 40},
+        ]
+
+    def expected(self, predicate, limit):
+        found = [item for item in self.items if predicate(item)]
+        return sorted(found, key=lambda item: -item['votes'])[:limit]
+
+    def test_light_prefix(self):
+        index = PrefixIndex.build(self.items)
+        self.assertEqual(index.tops, {})
+        self.assertEqual([i['id'] for i in index.lookup('Amél')], ['tt0211915'])
+        # Un mot du milieu du libellé, sans accent ni casse
+        self.assertEqual([i['id'] for i in index.lookup('destin d ame')], ['tt0211915'])
+        self.assertEqual(index.lookup('  '), [])
+        self.assertEqual(index.lookup('zorro'), [])
+
+    def test_heavy_prefix_uses_precomputed_top(self):
+        with mock.patch('movies.services.autocomplete.RANGE_SCAN_LIMIT', 5):
+            index = PrefixIndex.build(self.items, limit=10)
+        self.assertIn('s', index.tops)
+        self.assertIn('sta', index.tops)
+
+        starts_with_st = lambda item: item['label'].lower().startswith('st')
+        self.assertEqual(index.lookup('st', limit=10), self.expected(starts_with_st, 10))
+        self.assertEqual(index.lookup('st', limit=3), self.expected(starts_with_st, 3))
+        # Un espace final : seulement les mots complets "star"
+        self.assertEqual(
+            index.lookup('star ', limit=10),
+            self.expected(lambda item: item['label'].startswith('Star '), 10)
+        )
+
+
+class LRUCacheTestCase(SimpleTestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=3)
+        cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        # Lire 'a' le rend récent : c'est 'b' qui sort à l'ajout de 'd'
+        self.assertEqual(cache.get_many(['a']), {'a': 1})
+        cache.set_many({'d': 4})
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']), {'a': 1, 'c': 3, 'd': 4})
+
+    def test_set_many_beyond_maxsize_keeps_the_last_keys(self):
+        cache = LRUCache(maxsize=2)
+        cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'b': 2, 'c': 3})
+
+    def test_update_refreshes_value_and_position(self):
+        cache = LRUCache(maxsize=2)
+        cache.set_many({'a': 1, 'b': 2})
+        cache.set_many({'a': 10})
+        cache.set_many({'c': 3})
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 10, 'c': 3})
+
+    def test_clear(self):
+        cache = LRUCache(maxsize=2)
+        cache.set_many({'a': 1})
+        cache.clear()
+        self.assertEqual(cache.get_many(['a']), {})
+
+
+class ImdbIdTestCase(SimpleTestCase):
+
+    def test_round_trip(self):
+        for value, prefix in (('tt0111161', MOVIE_PREFIX), ('nm0000158', PERSON_PREFIX), ('tt10872600', MOVIE_PREFIX)):
+            self.assertEqual(decode(encode(value), prefix), value)
+        self.assertEqual(encode('tt0111161'), 111161)
+        self.assertEqual(decode(111161, MOVIE_PREFIX), 'tt0111161')
+
+    def test_non_canonical_values_are_kept(self):
+        # 'tt111161' redeviendrait 'tt0111161' : on ne l'encode pas pour ne pas changer d'identifiant
+        for value in ('tt111161', 'tt', 'xx0111161', 'tt01a1161', '', None, 42):
+            self.assertEqual(encode(value), value)
+
+    def test_decode_keeps_text_and_booleans(self):
+        self.assertEqual(decode('tt0111161', MOVIE_PREFIX), 'tt0111161')
+        self.assertIsNone(decode(None, MOVIE_PREFIX))
+        self.assertIs(decode(True, MOVIE_PREFIX), True)
+
+    def test_db_id_follows_storage_setting(self):
+        with override_settings(IMDB_ID_STORAGE='text'):
+            self.assertEqual(db_id('tt0111161'), 'tt0111161')
+        with override_settings(IMDB_ID_STORAGE='integer'):
+            self.assertEqual(db_id('tt0111161'), 111161)
@@ -1,10 +1,26 @@
-from .models import Movie, Principal, Profession, Rating, Genre
+from .models import Movie, Person, Principal, Character
 from django.core.paginator import Paginator
 from pymongo import MongoClient
+from .services.mongo_service import mongo_service
+from .services.sqlite_service import sqlite_service
+from .services.sampler import movie_sampler
+from .services.stats_cache import stats_cache
+from .services.search_service import search_service
+from .services.reference_data import reference_data
+from .services.ids import MOVIE_PREFIX, PERSON_PREFIX, decode
+from .fields import db_id
+from .services.autocomplete import get_index
+from .pagination import KeysetPage
+from .services.catalogue import SORT_FIELDS, cached_facets, catalogue_queryset
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404, Http404
+from django.http import JsonResponse
+from django.urls import reverse
 
 from django.db.models import Count
 from collections import Counter
+from urllib.parse import urlencode
+import math
 
 client = MongoClient("mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0")
 db_mongo = client['MongoDB']
@@ -18,65 +34,157 @@ def home(request):
         else:
             return redirect(f'/search/?q={user_input}')
     
-    nb_films = Movie.objects.all().count()
-    nb_acteurs = Profession.objects.filter(jobname__icontains='actor').count()
-    nb_producteurs = Profession.objects.filter(jobname__icontains='producer').count()
-    
-    top_10 = Rating.objects.select_related('mid').filter(numvotes__gt=10000).order_by('-averagerating')[:10]
-    random_movies = Movie.objects.order_by('?')[:4]
+    # Compteurs et top 10 lus dans DASHBOARD_STATS, rafraîchie après chaque import
+    stats = sqlite_service.get_dashboard_stats()
+    random_movies = movie_sampler.sample(4, **settings.HOME_RANDOM_FILTERS)
 
     context = {
-        'total_films': nb_films,
-        'total_acteurs': nb_acteurs,
-        'total_producteurs': nb_producteurs,
-        'top_movies': top_10,
+        'total_films': stats['total_films'],
+        'total_acteurs': stats['total_acteurs'],
+        'total_producteurs': stats['total_producteurs'],
+        'top_movies': stats['top_movies'],
         'random_movies': random_movies,
     }
     
     return render(request, 'movies/home.html', context)
 
 
-def movie_detail(request, mid):
-    movie_doc = db_mongo.MOVIE.find_one({"mid": mid})
+def _detail_from_flat(mid):
+    key = db_id(mid)
+    movie_doc = db_mongo.MOVIE.find_one({"mid": key})
     if not movie_doc:
         raise Http404("Film non trouvé")
-        
+    movie_doc['mid'] = mid
     
-    rating = db_mongo.RATING.find_one({"mid": mid})
+    rating = db_mongo.RATING.find_one({"mid": key})
 
-    genres_cursor = db_mongo.GENRE.find({"mid": mid})
+    genres_cursor = db_mongo.GENRE.find({"mid": key})
     movie_genres = [g['genre'] for g in genres_cursor]
 
-    principals = list(db_mongo.PRINCIPAL.find({"mid": mid}).sort("ordering", 1))
-    full_cast = []
-    for p in principals:
-        person = db_mongo.PERSON.find_one({"pid": p['pid']})
-        char = db_mongo.CHARACTER.find_one({"mid": mid, "pid": p['pid']})
-        if person:
-            full_cast.append({
-                'name': person.get('primaryName'),
-                'category': p.get('category'),
-                'character': char.get('name') if char else None,
-            })
-
-    titles = list(db_mongo.TITLE.find({"mid": mid}))
-    first_genre = Genre.objects.filter(mid=mid).first()
-    similars = Movie.objects.filter(genre__genre=first_genre.genre).exclude(mid=mid)[:4] if first_genre else []
-
-    return render(request, 'movies/movie_detail.html', {
+    full_cast = mongo_service.get_full_cast(mid)
+
+    titles = list(db_mongo.TITLE.find({"mid": key}))
+
+    return {
         'movie': movie_doc,
         'movie_genres': movie_genres,
         'rating': rating,
         'cast': full_cast,
         'titles': titles,
-        'similars': similars
-    })
+    }
+
 
+def _detail_from_complete(doc):
+    # Remet le document MOVIE_COMPLETE au format attendu par le template
+    movie = {
+        'mid': decode(doc['_id'], MOVIE_PREFIX),
+        'primaryTitle': doc.get('title'),
+        'titleType': doc.get('titleType'),
+        'startYear': doc.get('year'),
+        'runtimeMinutes': doc.get('runtime'),
+    }
+    rating = doc.get('rating') or {}
+
+    members = doc.get('cast', []) + doc.get('directors', []) + doc.get('crew', [])
+    members.sort(key=lambda m: m.get('ordering') or 0)
+    full_cast = [
+        {
+            'name': m.get('name'),
+            'category': m.get('category'),
+            'character': m['characters'][0] if m.get('characters') else None,
+        }
+        for m in members
+    ]
+
+    return {
+        'movie': movie,
+        'movie_genres': doc.get('genres', []),
+        'rating': {'averageRating': rating.get('average'), 'numVotes': rating.get('votes')},
+        'cast': full_cast,
+        'titles': doc.get('titles', []),
+    }
+
+
+def movie_detail(request, mid):
+    context = None
+    if settings.MOVIE_DETAIL_SOURCE == 'structured':
+        # Une seule lecture ; on ne retombe sur les collections plates que si le document manque
+        movie_complete = mongo_service.get_movie_complete(mid)
+        if movie_complete:
+            context = _detail_from_complete(movie_complete)
+
+    if context is None:
+        context = _detail_from_flat(mid)
+
+    similars = mongo_service.get_similars(mid)
+    if similars is None:
+        # Film absent de SIMILAR (compute_similars pas encore relancé depuis son import) :
+        # ancienne suggestion par genre. Une liste vide est une réponse et s'affiche telle quelle.
+        movie_genres = context['movie_genres']
+        similars = [
+            {'mid': m.mid, 'title': m.primarytitle}
+            for m in Movie.objects.filter(genre__genre=movie_genres[0]).exclude(mid=mid)[:4]
+        ] if movie_genres else []
+    context['similars'] = similars[:4]
+
+    return render(request, 'movies/movie_detail.html', context)
+
+
+
+def _filmography_from_flat(nconst):
+    # Même format que PERSON_COMPLETE, reconstruit depuis SQLite si le document manque
+    person = get_object_or_404(Person, pid=nconst)
+    characters = {}
+    for mid, name in Character.objects.filter(pid=nconst).values_list('mid', 'name'):
+        characters.setdefault(decode(mid, MOVIE_PREFIX), []).append(name)
+
+    rows = Principal.objects.filter(pid=nconst).values(
+        'mid', 'category', 'mid__primarytitle', 'mid__titletype', 'mid__startyear',
+        'mid__rating__averagerating', 'mid__rating__numvotes',
+    )
+    credits = []
+    for row in rows:
+        mid = decode(row['mid'], MOVIE_PREFIX)
+        credits.append({
+            'mid': mid,
+            'title': row['mid__primarytitle'],
+            'titleType': row['mid__titletype'],
+            'year': row['mid__startyear'],
+            'rating': row['mid__rating__averagerating'],
+            'votes': row['mid__rating__numvotes'],
+            'category': row['category'],
+            'characters': characters.get(mid, []),
+        })
+    credits.sort(key=lambda c: (c['year'] is None, -(c['year'] or 0), c['mid']))
+    return person.primaryname, credits
+
+
+def _career_by_decade(credits):
+    # Mêmes règles que Evolution_Carriere : longs métrages datés et notés
+    decades = {}
+    for credit in credits:
+        if credit.get('titleType') != 'movie' or credit.get('year') is None or credit.get('rating') is None:
+            continue
+        decades.setdefault(credit['year'] // 10 * 10, []).append(credit['rating'])
+    return [
+        {'decade': decade, 'films': len(ratings), 'rating': round(sum(ratings) / len(ratings), 2)}
+        for decade, ratings in sorted(decades.items())
+    ]
 
 
 def actor_films(request, nconst):
-    films = Principal.objects.filter(nconst=nconst).select_related('tconst')
-    return render(request, 'actor.html', {'films': films})
+    person = mongo_service.get_person_complete(nconst)
+    if person:
+        name, credits = person.get('name'), person['credits']
+    else:
+        name, credits = _filmography_from_flat(nconst)
+
+    return render(request, 'movies/actor.html', {
+        'nconst': nconst,
+        'name': name,
+        'credits': credits,
+        'decades': _career_by_decade(credits),
+    })
 
 def benchmarks(request):
     data = {
@@ -92,14 +200,22 @@ def search(request):
     movie_results = []
     person_results = []
 
-    if query:
+    if query and search_service.is_available():
+        movie_results = search_service.search_movies(query)
+        person_results = search_service.search_persons(query)
+    elif query:
+        # Index pas encore construit (build_search_index.py) : recherche par regex
         movie_results = list(db_mongo.MOVIE.find({
             "primaryTitle": {"$regex": query, "$options": "i"}
         }).limit(10))
+        for movie in movie_results:
+            movie['mid'] = decode(movie['mid'], MOVIE_PREFIX)
 
         person_results = list(db_mongo.PERSON.find({
             "primaryName": {"$regex": query, "$options": "i"}
         }).limit(10))
+        for person in person_results:
+            person['pid'] = decode(person['pid'], PERSON_PREFIX)
 
     return render(request, 'movies/search.html', {
         'query': query,
@@ -108,47 +224,114 @@ def search(request):
     })
 
 
+def autocomplete(request):
+    query = request.GET.get('q', '')
+    results = []
+    for item in get_index().lookup(query):
+        url_name, arg = ('movie_detail', 'mid') if item['kind'] == 'movie' else ('actor_films', 'nconst')
+        results.append({
+            'kind': item['kind'],
+            'id': item['id'],
+            'label': item['label'],
+            'year': item['year'],
+            'url': reverse(url_name, kwargs={arg: item['id']}),
+        })
+    return JsonResponse({'query': query, 'results': results})
+
+
+def _page_url(params, **changes):
+    query = {k: v for k, v in params.items() if k not in ('page', 'after', 'before', 'last', 'p')}
+    query.update(changes)
+    return '?' + urlencode(query)
+
+
+def _offset_pagination(request, movies_queryset, sort_by, order):
+    sort_prefix = '-' if order == 'desc' else ''
+    movies_queryset = movies_queryset.order_by(f"{sort_prefix}{SORT_FIELDS[sort_by][0]}")
+
+    paginator = Paginator(movies_queryset, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    params = request.GET.dict()
+
+    return {
+        'page': page_obj,
+        'label': f"{page_obj.number} / {paginator.num_pages}",
+        'first_url': _page_url(params, page=1) if page_obj.has_previous() else None,
+        'previous_url': _page_url(params, page=page_obj.previous_page_number()) if page_obj.has_previous() else None,
+        'next_url': _page_url(params, page=page_obj.next_page_number()) if page_obj.has_next() else None,
+        'last_url': _page_url(params, page=paginator.num_pages) if page_obj.has_next() else None,
+    }
+
+
+def _keyset_pagination(request, movies_queryset, sort_by, order, facets):
+    # Curseur (valeur de tri, mid) dans l'URL : la page 5000 coûte autant que la première
+    field, tiebreak = SORT_FIELDS[sort_by]
+    params = request.GET.dict()
+    last = bool(params.get('last'))
+
+    total = facets['total']
+    num_pages = max(1, math.ceil(total / 20))
+
+    # La dernière page ne contient que le reste, pour rester alignée sur les pages suivantes
+    per_page = (total - (num_pages - 1) * 20 or 20) if last else 20
+    page = KeysetPage(
+        movies_queryset, field, order == 'desc',
+        after=params.get('after'), before=params.get('before'), last=last, per_page=per_page, tiebreak=tiebreak,
+    )
+    try:
+        number = num_pages if last else int(params.get('p', 1))
+    except ValueError:
+        number = 1
+
+    return {
+        'page': page,
+        'label': f"{number} / {num_pages}",
+        'first_url': _page_url(params) if page.has_previous else None,
+        'previous_url': _page_url(params, before=page.previous_cursor, p=number - 1) if page.has_previous else None,
+        'next_url': _page_url(params, after=page.next_cursor, p=number + 1) if page.has_next else None,
+        'last_url': _page_url(params, last=1) if page.has_next else None,
+    }
+
+
 def movies(request):
     genre_query = request.GET.get('genre')
     year_min = request.GET.get('year_min')
     year_max = request.GET.get('year_max')
     rating_min = request.GET.get('rating_min')
-    sort_by = request.GET.get('sort', 'startyear')
-    order = request.GET.get('order', 'desc')
-
-    movies_queryset = Movie.objects.select_related('rating').all()
 
     sort_by = request.GET.get('sort')
-    if not sort_by:
+    if sort_by not in SORT_FIELDS:
         sort_by = 'startyear'
         
     order = request.GET.get('order')
     if not order:
         order = 'desc'
 
-    if genre_query:
-        movies_queryset = movies_queryset.filter(genre__genre=genre_query)
-    if year_min:
-        movies_queryset = movies_queryset.filter(startyear__gte=year_min)
-    if year_max:
-        movies_queryset = movies_queryset.filter(startyear__lte=year_max)
-    if rating_min:
-        movies_queryset = movies_queryset.filter(rating__averagerating__gte=rating_min)
+    movies_queryset = catalogue_queryset(genre_query, year_min, year_max, rating_min)
 
-    sort_prefix = '-' if order == 'desc' else ''
-    if sort_by == 'rating':
-        movies_queryset = movies_queryset.order_by(f"{sort_prefix}rating__averagerating")
+    # Total et compteurs par genre / décennie, sommés dans CATALOGUE_FACETS
+    facets = cached_facets(genre=genre_query, year_min=year_min, year_max=year_max, rating_min=rating_min)
+
+    if settings.CATALOGUE_PAGINATION == 'keyset':
+        pagination = _keyset_pagination(request, movies_queryset, sort_by, order, facets)
     else:
-        movies_queryset = movies_queryset.order_by(f"{sort_prefix}{sort_by}")
+        pagination = _offset_pagination(request, movies_queryset, sort_by, order)
 
-    paginator = Paginator(movies_queryset, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    all_genres = reference_data.get('genres')
 
-    all_genres = Genre.objects.values_list('genre', flat=True).distinct().order_by('genre')
+    params = request.GET.dict()
+    genre_facets = [(name, count, _page_url(params, genre=name)) for name, count in facets['genres']]
+    decade_facets = [
+        (decade, count, _page_url(params, year_min=decade, year_max=decade + 9))
+        for decade, count in facets['decades']
+    ]
 
     context = {
-        'page_obj': page_obj,
+        'page_obj': pagination['page'],
+        'pagination': pagination,
+        'total': facets['total'],
+        'genre_facets': genre_facets,
+        'decade_facets': decade_facets,
         'all_genres': all_genres,
         'current_params': request.GET.dict(),
     }
@@ -156,30 +339,35 @@ def movies(request):
 
 
 
-def stats(request):
+def _stats_genres():
     raw_genres = list(db_mongo.GENRE.aggregate([
         {"$group": {"_id": "$genre", "count": {"$sum": 1}}},
         {"$sort": {"count": -1}},
         {"$limit": 10}
     ]))
-    genres = [{'label': g['_id'], 'count': g['count']} for g in raw_genres]
+    return [{'label': g['_id'], 'count': g['count']} for g in raw_genres]
 
 
+def _stats_decades():
     raw_decades = list(db_mongo.MOVIE.aggregate([
         {"$match": {"startYear": {"$ne": None}}},
         {"$project": {"decade": {"$subtract": ["$startYear", {"$mod": ["$startYear", 10]}]}}},
         {"$group": {"_id": "$decade", "count": {"$sum": 1}}},
         {"$sort": {"_id": 1}}
     ]))
-    decades = [{'label': int(d['_id']), 'count': d['count']} for d in raw_decades if d['_id']]
+    return [{'label': int(d['_id']), 'count': d['count']} for d in raw_decades if d['_id']]
+
 
+def _stats_ratings():
     raw_ratings = list(db_mongo.RATING.aggregate([
         {"$project": {"score": {"$floor": "$averageRating"}}},
         {"$group": {"_id": "$score", "count": {"$sum": 1}}},
         {"$sort": {"_id": 1}}
     ]))
-    ratings = [{'label': int(r['_id']), 'count': r['count']} for r in raw_ratings]
+    return [{'label': int(r['_id']), 'count': r['count']} for r in raw_ratings]
 
+
+def _stats_actors():
     raw_actors = list(db_mongo.PRINCIPAL.aggregate([
         {"$match": {"category": {"$in": ["actor", "actress"]}}},
         {"$group": {"_id": "$pid", "count": {"$sum": 1}}},
@@ -187,17 +375,18 @@ def stats(request):
         {"$limit": 10}
     ]))
     
-    actors = []
-    for a in raw_actors:
-        p = db_mongo.PERSON.find_one({"pid": a['_id']})
-        actors.append({
-            'label': p.get('primaryName', 'Inconnu') if p else "Inconnu",
-            'count': a['count']
-        })
+    names = mongo_service.get_person_names(a['_id'] for a in raw_actors)
+    return [
+        {'label': names.get(a['_id']) or "Inconnu", 'count': a['count']}
+        for a in raw_actors
+    ]
+
 
+def stats(request):
+    # Agrégations servies depuis la mémoire, recalculées seulement après un import
     return render(request, 'movies/stats.html', {
-        'genres': genres,
-        'decades': decades,
-        'ratings': ratings,
-        'actors': actors
-    })
\ No newline at end of file
+        'genres': stats_cache.get('genres', ['GENRE'], _stats_genres),
+        'decades': stats_cache.get('decades', ['MOVIE'], _stats_decades),
+        'ratings': stats_cache.get('ratings', ['RATING'], _stats_ratings),
+        'actors': stats_cache.get('actors', ['PRINCIPAL', 'PERSON'], _stats_actors),
+    })
@@ -0,0 +1,233 @@
+import argparse
+import contextlib
+import gc
+import json
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from pymongo import MongoClient
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPTS_DIR, 'phase1_sqlite'))
+sys.path.append(os.path.join(SCRIPTS_DIR, 'phase2_mongodb'))
+import queries as sqlite_queries
+import queries_mongo as mongo_queries
+
+# Harnais de mesure commun des neuf requêtes d'analyse.
+#   python scripts/benchmark.py --backend sqlite --output bench_sqlite.json
+#   python scripts/benchmark.py --backend mongo_structured --runs 30
+# Chaque requête est exécutée WARMUPS fois sans mesure, puis RUNS fois mesurées
+# (perf_counter_ns) ; on garde médiane, p95 et p99. Les paramètres des requêtes
+# sont fixes et le commit est noté dans le JSON : deux fichiers produits sur
+# des commits différents se comparent directement.
+
+# Requêtes et paramètres, identiques pour tous les backends
+WORKLOADS = [
+    ("Filmographie", ["Tom Hanks"]),
+    ("Top_Film", ["Comedy", 1980, 2000, 10]),
+    ("Multi_Role", []),
+    ("Collaboration", ["Tom Hanks"]),
+    ("Genre_Populaire", []),
+    ("Evolution_Carriere", ["Clint Eastwood"]),
+    ("Meilleur_Film_Par_Genre", []),
+    ("Carriere_Propulse", []),
+    ("Derniere", []),
+]
+
+WARMUPS = 2
+RUNS = 10
+
+DB_PATH = os.path.join(SCRIPTS_DIR, '..', 'data', 'imdb.db')
+MONGO_URI = "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+
+
+class SQLiteBackend:
+    """Requêtes de scripts/phase1_sqlite/queries.py sur la base SQLite."""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        sqlite_queries.conn = self.conn
+        sqlite_queries.DB_PATH = db_path
+
+    def workload(self, name):
+        return getattr(sqlite_queries, name)
+
+    def drop_indexes(self):
+        sqlite_queries.Fin_Index()
+
+    def create_indexes(self):
+        sqlite_queries.Create_Indexes()
+
+    def size_mb(self):
+        return sqlite_queries.get_db_size()
+
+    def close(self):
+        self.conn.close()
+
+
+class MongoBackend:
+    """Requêtes de scripts/phase2_mongodb/queries_mongo.py.
+
+    structured=False : collections plates et $lookup ; structured=True :
+    variantes *_Complete sur MOVIE_COMPLETE et PERSON_COMPLETE.
+    """
+
+    def __init__(self, uri, structured):
+        self.client = MongoClient(uri)
+        mongo_queries.db = self.client["MongoDB"]
+        self.suffix = "_Complete" if structured else ""
+
+    def workload(self, name):
+        return getattr(mongo_queries, name + self.suffix)
+
+    def drop_indexes(self):
+        mongo_queries.Fin_Index()
+
+    def create_indexes(self):
+        mongo_queries.Create_Indexes()
+
+    def size_mb(self):
+        return mongo_queries.get_db_size()
+
+    def close(self):
+        self.client.close()
+
+
+BACKENDS = {
+    'sqlite': lambda args: SQLiteBackend(args.database),
+    'mongo_flat': lambda args: MongoBackend(args.mongo_uri, structured=False),
+    'mongo_structured': lambda args: MongoBackend(args.mongo_uri, structured=True),
+}
+
+
+def percentile(sorted_values, p):
+    # Rang le plus proche : p99 sur 10 mesures = le maximum
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples_ns):
+    ordered = sorted(samples_ns)
+    to_ms = lambda ns: round(ns / 1e6, 3)
+    return {
+        "median_ms": to_ms(statistics.median(ordered)),
+        "p95_ms": to_ms(percentile(ordered, 95)),
+        "p99_ms": to_ms(percentile(ordered, 99)),
+        "min_ms": to_ms(ordered[0]),
+        "max_ms": to_ms(ordered[-1]),
+    }
+
+
+def measure(func, args, warmups, runs):
+    """Temps d'exécution de func(*args) en ns ; l'affichage n'est pas dans la mesure."""
+    for _ in range(warmups):
+        func(*args)
+
+    gc.collect()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter_ns()
+        result = func(*args)
+        samples.append(time.perf_counter_ns() - start)
+    return samples, len(result)
+
+
+def run_workloads(backend, names, warmups, runs):
+    results = {}
+    for name, args in WORKLOADS:
+        if name not in names:
+            continue
+        samples, rows = measure(backend.workload(name), args, warmups, runs)
+        results[name] = dict(args=args, rows=rows, runs=runs, **summarize(samples))
+        print(f"{name:<25} médiane {results[name]['median_ms']:>10} ms | p95 {results[name]['p95_ms']:>10} ms"
+              f" | p99 {results[name]['p99_ms']:>10} ms | {rows} lignes", file=sys.stderr)
+    return results
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SCRIPTS_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPTS_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure des neuf requêtes d'analyse sur un backend")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), required=True)
+    parser.add_argument('--warmups', type=int, default=WARMUPS, help="Exécutions non mesurées par requête")
+    parser.add_argument('--runs', type=int, default=RUNS, help="Exécutions mesurées par requête")
+    parser.add_argument('--workloads', nargs='+', choices=[name for name, _ in WORKLOADS],
+                        default=[name for name, _ in WORKLOADS], help="Sous-ensemble des requêtes")
+    parser.add_argument('--compare-indexes', action='store_true',
+                        help="Mesure sans puis avec les index de la comparaison (retire à la fin ceux qu'il a créés)")
+    parser.add_argument('--database', default=DB_PATH, help="Base SQLite (backend sqlite)")
+    parser.add_argument('--mongo-uri', default=MONGO_URI, help="URI MongoDB (backends mongo_*)")
+    parser.add_argument('--output', help="Fichier JSON (sortie standard par défaut)")
+    args = parser.parse_args(argv)
+
+    if args.compare_indexes and args.backend == 'mongo_structured':
+        parser.error("--compare-indexes ne concerne que sqlite et mongo_flat")
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "commit": commit,
+            "dirty": dirty,
+            "date": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "warmups": args.warmups,
+            "runs": args.runs,
+        },
+        "results": [],
+    }
+
+    backend = BACKENDS[args.backend](args)
+    try:
+        if args.compare_indexes:
+            modes = [("sans", backend.drop_indexes), ("avec", backend.create_indexes)]
+        else:
+            modes = [("actuels", None)]
+
+        for label, prepare in modes:
+            if prepare:
+                # Les messages des fonctions d'index ne doivent pas se mêler au JSON
+                with contextlib.redirect_stdout(sys.stderr):
+                    prepare()
+            print(f"--- {args.backend}, index {label} ---", file=sys.stderr)
+            report["results"].append({
+                "indexes": label,
+                "size_mb": round(backend.size_mb(), 2),
+                "workloads": run_workloads(backend, args.workloads, args.warmups, args.runs),
+            })
+
+        if args.compare_indexes:
+            # La base mesurée retrouve ses index de départ
+            with contextlib.redirect_stdout(sys.stderr):
+                backend.drop_indexes()
+    finally:
+        backend.close()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+        print(f"Résultats écrits dans {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
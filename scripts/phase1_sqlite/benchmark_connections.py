@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+# Compare une connexion ouverte par requête (ancien SQLiteService) et les
+# connexions persistantes du service actuel, sur les requêtes du site.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cineexplorer.settings')
+
+from movies.services.sqlite_service import SQLiteService
+
+DATABASE_FILE = './cineexplorer/data/imdb.db'
+REPETITIONS = 200
+
+QUERIES = [
+    ("Genres", "SELECT DISTINCT genre FROM GENRE ORDER BY genre ASC", ()),
+    ("Film par mid", "SELECT * FROM MOVIE WHERE mid = ?", ('tt0111161',)),
+    ("Note par mid", "SELECT averageRating, numVotes FROM RATING WHERE mid = ?", ('tt0111161',)),
+    ("Casting", "SELECT pid, category FROM PRINCIPAL WHERE mid = ? ORDER BY ordering", ('tt0111161',)),
+    ("Compteur MOVIE", "SELECT COUNT(*) AS cnt FROM MOVIE", ()),
+]
+
+
+def query_per_connection(query, params):
+    conn = sqlite3.connect(DATABASE_FILE)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def measure(run, query, params):
+    timings = []
+    for _ in range(REPETITIONS):
+        s = time.perf_counter()
+        run(query, params)
+        timings.append((time.perf_counter() - s) * 1000)
+    return statistics.median(timings)
+
+
+if __name__ == '__main__':
+    service = SQLiteService(db_path=DATABASE_FILE)
+
+    print("\n" + "=" * 75)
+    print(f"{'Requêtes':<20} | {'Par requête (ms)':<17} | {'Persistante (ms)':<17} | {'Gain (%)':<10}")
+    print("-" * 75)
+    for nom, query, params in QUERIES:
+        avant = measure(query_per_connection, query, params)
+        apres = measure(service._execute_query, query, params)
+        gain = round((avant - apres) / avant * 100, 1) if avant else 0
+        print(f"{nom:<20} | {avant:<17.3f} | {apres:<17.3f} | {gain:<10}%")
+    print("=" * 75)
+    print(f"Médiane sur {REPETITIONS} exécutions par requête")
+    service.close_all()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import sqlite3
+import statistics
+import time
+
+# Compare deux bases issues de import_data.py : identifiants texte (par défaut)
+# et identifiants entiers (--integer-ids). Tailles des tables et index, puis
+# temps des requêtes qui joignent sur mid / pid.
+#   python scripts/phase1_sqlite/import_data.py --database text.db
+#   python scripts/phase1_sqlite/import_data.py --database int.db --integer-ids
+#   python scripts/phase1_sqlite/compare_id_layouts.py text.db int.db
+
+REPETITIONS = 20
+
+QUERIES = [
+    ("Filmographie", """
+        SELECT m.primaryTitle FROM PERSON p
+        JOIN PRINCIPAL pr ON pr.pid = p.pid
+        JOIN MOVIE m ON m.mid = pr.mid
+        WHERE p.pid = :pid
+    """),
+    ("Casting", """
+        SELECT p.primaryName, pr.category FROM PRINCIPAL pr
+        JOIN PERSON p ON p.pid = pr.pid
+        WHERE pr.mid = :mid ORDER BY pr.ordering
+    """),
+    ("Collaborations", """
+        SELECT p2.pid, COUNT(*) FROM PRINCIPAL p1
+        JOIN PRINCIPAL p2 ON p2.mid = p1.mid AND p2.pid != p1.pid
+        WHERE p1.pid = :pid GROUP BY p2.pid
+    """),
+    ("Note moyenne par genre", """
+        SELECT g.genre, AVG(r.averageRating) FROM GENRE g
+        JOIN RATING r ON r.mid = g.mid GROUP BY g.genre
+    """),
+]
+
+
+def sizes(conn):
+    # Octets par table / index (table virtuelle dbstat)
+    rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    return dict(rows)
+
+
+def sample_ids(conn):
+    # Personne la plus présente dans PRINCIPAL et un de ses films : mêmes entités dans les deux bases
+    pid, = conn.execute("SELECT pid FROM PRINCIPAL GROUP BY pid ORDER BY COUNT(*) DESC, pid LIMIT 1").fetchone()
+    mid, = conn.execute("SELECT mid FROM PRINCIPAL WHERE pid = ? ORDER BY mid LIMIT 1", (pid,)).fetchone()
+    return {'pid': pid, 'mid': mid}
+
+
+def measure(conn, query, params):
+    timings = []
+    for _ in range(REPETITIONS):
+        s = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        timings.append((time.perf_counter() - s) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison identifiants texte / entiers")
+    parser.add_argument('text_db')
+    parser.add_argument('integer_db')
+    args = parser.parse_args()
+
+    conns = [sqlite3.connect(path) for path in (args.text_db, args.integer_db)]
+    text_sizes, integer_sizes = (sizes(conn) for conn in conns)
+
+    print("\n" + "=" * 80)
+    print(f"{'Table / index':<40} | {'Texte (Mo)':<10} | {'Entiers (Mo)':<12} | {'Gain (%)':<8}")
+    print("-" * 80)
+    for name in sorted(text_sizes, key=lambda n: -text_sizes[n]):
+        if name.startswith('sqlite_stat') or name not in integer_sizes:
+            continue
+        avant, apres = text_sizes[name] / 1e6, integer_sizes[name] / 1e6
+        gain = round((avant - apres) / avant * 100, 1) if avant else 0
+        print(f"{name:<40} | {avant:<10.2f} | {apres:<12.2f} | {gain:<8}")
+    print("-" * 80)
+    files = [os.path.getsize(path) / 1e6 for path in (args.text_db, args.integer_db)]
+    print(f"{'Fichier':<40} | {files[0]:<10.2f} | {files[1]:<12.2f} |")
+
+    print("\n" + "=" * 80)
+    print(f"{'Requêtes':<40} | {'Texte (ms)':<10} | {'Entiers (ms)':<12} | {'Gain (%)':<8}")
+    print("-" * 80)
+    params = [sample_ids(conn) for conn in conns]
+    for nom, query in QUERIES:
+        avant, apres = (measure(conn, query, p) for conn, p in zip(conns, params))
+        gain = round((avant - apres) / avant * 100, 1) if avant else 0
+        print(f"{nom:<40} | {avant:<10.3f} | {apres:<12.3f} | {gain:<8}")
+    print("=" * 80)
+    print(f"Médiane sur {REPETITIONS} exécutions")
+
+    for conn in conns:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,161 +1,114 @@
 import sqlite3
 import pandas as pd
+import numpy as np
+import argparse
+import hashlib
+import io
 import time
 import os
+import sys
+from collections import deque
+from multiprocessing import Pool
+
+# Accès au package movies (tables matérialisées) depuis la racine du projet
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from movies.services.materialize import bump_import_generation, rebuild_movie_browse, refresh_dashboard_stats, refresh_row_counts
+from movies.services.index_manager import ensure_indexes
 
 
 DATABASE_FILE = './cineexplorer/data/imdb.db' 
 
 
-def create_base():
-    if os.path.exists(DATABASE_FILE):
-        os.remove(DATABASE_FILE)
+# =========================================================================
+# SCHÉMA
+# Déclaré une fois : (table, colonnes, clé primaire, clés étrangères).
+# Le mode normal crée les tables avec leur clé primaire ; le mode bulk les
+# crée sans (aucun index à maintenir pendant le chargement) et ne construit
+# les tables définitives, triées par clé, qu'à la fin.
+# =========================================================================
+
+SCHEMA = [
+    # --- ENTITÉS PRINCIPALES : MID et PID sont référencés par les autres tables ---
+    ('MOVIE', [
+        'mid VARCHAR(50)', 'titleType VARCHAR(50)', 'primaryTitle VARCHAR(255)', 'originalTitle VARCHAR(255)',
+        'isAdult INTEGER', 'startYear INTEGER', 'endYear FLOAT', 'runtimeMinutes FLOAT',
+    ], ['mid'], []),
+    ('PERSON', [
+        'pid VARCHAR(50)', 'primaryName VARCHAR(255)', 'birthYear FLOAT', 'deathYear FLOAT',
+    ], ['pid'], []),
 
+    # --- ENTITÉS DÉPENDANTES (1-1 ou 1-N) ---
+    ('GENRE', ['mid VARCHAR(50)', 'genre VARCHAR(50)'], ['mid', 'genre'], [('mid', 'MOVIE(mid)')]),
+    ('RATING', ['mid VARCHAR(50)', 'averageRating FLOAT', 'numVotes INTEGER'], ['mid'], [('mid', 'MOVIE(mid)')]),
+    ('EPISODE', [
+        'mid VARCHAR(50)', 'parentMid VARCHAR(50)', 'seasonNumber FLOAT', 'episodeNumber FLOAT',
+    ], ['mid'], [('parentMid', 'MOVIE(mid)')]),
 
-    print(f"Création de la base de données : {DATABASE_FILE}...")
-    
-    conn = sqlite3.connect(DATABASE_FILE)
+    # --- TABLES DE JONCTION (N-M) ---
+    ('PRINCIPAL', [
+        'mid VARCHAR(50)', 'ordering INTEGER', 'pid VARCHAR(50)', 'category VARCHAR(100)', 'job TEXT',
+    ], ['mid', 'ordering'], [('mid', 'MOVIE(mid)'), ('pid', 'PERSON(pid)')]),
+    ('CHARACTER', [
+        'mid VARCHAR(50) NOT NULL', 'pid VARCHAR(50) NOT NULL', 'name TEXT',
+    ], ['mid', 'pid', 'name'], [('mid', 'MOVIE(mid)'), ('pid', 'PERSON(pid)')]),
+    ('DIRECTOR', ['mid VARCHAR(50)', 'pid VARCHAR(50)'], ['mid', 'pid'], [('mid', 'MOVIE(mid)'), ('pid', 'PERSON(pid)')]),
+    ('WRITER', ['mid VARCHAR(50)', 'pid VARCHAR(50)'], ['mid', 'pid'], [('mid', 'MOVIE(mid)'), ('pid', 'PERSON(pid)')]),
+    ('PROFESSION', ['pid VARCHAR(50)', 'jobName VARCHAR(100)'], ['pid', 'jobName'], [('pid', 'PERSON(pid)')]),
+    ('KNOWN_FOR', ['pid VARCHAR(50)', 'mid VARCHAR(50)'], ['pid', 'mid'], [('pid', 'PERSON(pid)'), ('mid', 'MOVIE(mid)')]),
+    ('TITLE', [
+        'mid VARCHAR(50)', 'ordering INTEGER', 'title TEXT', 'region VARCHAR(10)', 'language VARCHAR(10)',
+        'types TEXT', 'attributes TEXT', 'isOriginalTitle INTEGER',
+    ], ['mid', 'ordering'], [('mid', 'MOVIE(mid)')]),
+]
+
+# Colonnes d'identifiants IMDb, vérifiées contre MOVIE / PERSON et stockées en
+# entier avec --integer-ids ('tt0111161' -> 111161, voir movies/services/ids.py)
+ID_COLUMNS = {'mid': 'MOVIE', 'pid': 'PERSON', 'parentMid': 'MOVIE'}
+
+# Mis à True par --integer-ids (et dans chaque processus du pool par init_worker)
+INTEGER_IDS = False
+
+# Réglages du mode bulk : pas de journal ni de fsync, gros cache. Une coupure
+# pendant l'import corrompt la base, qu'il suffit alors de réimporter.
+BULK_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -1048576",   # 1 Go
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA locking_mode = EXCLUSIVE",
+]
+
+
+def column_ddl(column):
+    name = column.split()[0]
+    if INTEGER_IDS and name in ID_COLUMNS:
+        return f"{name} INTEGER" + (" NOT NULL" if "NOT NULL" in column else "")
+    return column
+
+
+def table_ddl(table_name, columns, primary_key, foreign_keys, with_keys=True):
+    lines = [column_ddl(column) for column in columns]
+    if with_keys:
+        lines.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+        lines += [f"FOREIGN KEY ({column}) REFERENCES {target}" for column, target in foreign_keys]
+    body = ',\n    '.join(lines)
+    return f"CREATE TABLE IF NOT EXISTS {table_name} (\n    {body}\n);"
+
+
+def create_base(database_file=DATABASE_FILE, bulk=False):
+    if os.path.exists(database_file):
+        os.remove(database_file)
+
+    print(f"Création de la base de données : {database_file}...")
+
+    conn = sqlite3.connect(database_file)
     cursor = conn.cursor()
 
     # Activation des contraintes de clés étrangères (Indispensable pour SQLite)
     cursor.execute("PRAGMA foreign_keys = ON;")
 
-    # =========================================================================
-    # 1. TABLES PRINCIPALES (ENTITÉS)
-    # Ces tables doivent exister pour que MID et PID puissent être référencés
-    # =========================================================================
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS MOVIE (
-        mid VARCHAR(50) PRIMARY KEY,
-        titleType VARCHAR(50),
-        primaryTitle VARCHAR(255),
-        originalTitle VARCHAR(255),
-        isAdult INTEGER,
-        startYear INTEGER,
-        endYear FLOAT,
-        runtimeMinutes FLOAT
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS PERSON (
-        pid VARCHAR(50) PRIMARY KEY,
-        primaryName VARCHAR(255),
-        birthYear FLOAT,
-        deathYear FLOAT
-    );
-    """)
-
-    # --- ENTITÉS DÉPENDANTES (1-1 ou 1-N) ---
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS GENRE (
-        mid VARCHAR(50),
-        genre VARCHAR(50),
-        PRIMARY KEY (mid, genre),
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS RATING (
-        mid VARCHAR(50) PRIMARY KEY,
-        averageRating FLOAT,
-        numVotes INTEGER,
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS EPISODE (
-        mid VARCHAR(50) PRIMARY KEY,
-        parentMid VARCHAR(50),
-        seasonNumber FLOAT,
-        episodeNumber FLOAT,
-        FOREIGN KEY (parentMid) REFERENCES MOVIE(mid)
-    );
-    """)
-
-    # --- TABLES DE JONCTION (N-M) ---
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS PRINCIPAL (
-        mid VARCHAR(50),
-        ordering INTEGER,
-        pid VARCHAR(50),
-        category VARCHAR(100),
-        job TEXT,
-        PRIMARY KEY (mid, ordering),
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid),
-        FOREIGN KEY (pid) REFERENCES PERSON(pid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS CHARACTER (
-        mid VARCHAR(50) NOT NULL,
-        pid VARCHAR(50) NOT NULL,
-        name TEXT,
-        PRIMARY KEY (mid, pid, name),
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid),
-        FOREIGN KEY (pid) REFERENCES PERSON(pid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS DIRECTOR (
-        mid VARCHAR(50),
-        pid VARCHAR(50),
-        PRIMARY KEY (mid, pid),
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid),
-        FOREIGN KEY (pid) REFERENCES PERSON(pid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS WRITER (
-        mid VARCHAR(50),
-        pid VARCHAR(50),
-        PRIMARY KEY (mid, pid),
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid),
-        FOREIGN KEY (pid) REFERENCES PERSON(pid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS PROFESSION (
-        pid VARCHAR(50),
-        jobName VARCHAR(100),
-        PRIMARY KEY (pid, jobName),
-        FOREIGN KEY (pid) REFERENCES PERSON(pid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS KNOWN_FOR (
-        pid VARCHAR(50),
-        mid VARCHAR(50),
-        PRIMARY KEY (pid, mid),
-        FOREIGN KEY (pid) REFERENCES PERSON(pid),
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS TITLE (
-        mid VARCHAR(50),
-        ordering INTEGER,
-        title TEXT,
-        region VARCHAR(10),
-        language VARCHAR(10),
-        types TEXT,
-        attributes TEXT,
-        isOriginalTitle INTEGER,
-        PRIMARY KEY (mid, ordering),
-        FOREIGN KEY (mid) REFERENCES MOVIE(mid)
-    );
-    """)
+    for table_name, columns, primary_key, foreign_keys in SCHEMA:
+        cursor.execute(table_ddl(table_name, columns, primary_key, foreign_keys, with_keys=not bulk))
 
     # Sauvegarde et fermeture
     conn.commit()
@@ -163,94 +116,487 @@ def create_base():
     print('Création des tables réussis')
 
 
-create_base()
-
-
-
-
-def Import_Data(conn, csv_name, table_name, chunk_size=10000):
-    global orphelin_supprime
-    global ligne_ajoute
-
-    print(f"\n-> Début de l'import de {csv_name}.csv dans la table {table_name}...")
-    csv_path = f'./cineexplorer/data/csv/{csv_name}.csv'
-    
-    start_time = time.time()
-
-    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, low_memory=False):
-        
-        #Renome les colonnes
-        chunk.columns = [col[2:-3] for col in chunk.columns]
-
-        #Vérifie que les pids / mids existent
-        try:
-            len_chunk = len(chunk)
-            chunk = chunk[chunk['mid'].isin(valid_mids)]
-            orphelin_supprime += len_chunk - len(chunk)
-        except:
-            pass
+def finalize_bulk(conn):
+    """Mode bulk : recopie chaque table chargée sans clé dans sa version définitive.
+
+    L'insertion triée par clé primaire construit l'index d'un seul passage ;
+    à clé égale, la première ligne lue dans le CSV est gardée (rowid), comme
+    avec INSERT OR IGNORE en mode normal.
+    """
+    for table_name, columns, primary_key, foreign_keys in SCHEMA:
+        s = time.time()
+        staging = f"{table_name}_BULK"
+        conn.execute(f"ALTER TABLE {table_name} RENAME TO {staging}")
+        conn.execute(table_ddl(table_name, columns, primary_key, foreign_keys))
+        conn.execute(
+            f"INSERT OR IGNORE INTO {table_name} SELECT * FROM {staging} ORDER BY {', '.join(primary_key)}, rowid"
+        )
+        conn.execute(f"DROP TABLE {staging}")
+        conn.commit()
+        print(f"{table_name:<12} : clé primaire construite en {time.time() - s:.1f} s")
+    conn.execute("ANALYZE")
+    conn.commit()
 
-        try:
-            len_chunk = len(chunk)
-            chunk = chunk[chunk['pid'].isin(valid_pids)]
-            orphelin_supprime += len_chunk - len(chunk)
-        except:
-            pass
 
-        try:
+def verify_against(conn, reference_file):
+    """Compare la base importée à une base de référence (import normal).
+
+    Renvoie la liste des différences : schéma, nombre de lignes, lignes
+    présentes d'un seul côté.
+    """
+    conn.execute("ATTACH DATABASE ? AS ref", (reference_file,))
+    differences = []
+    try:
+        for table_name, *_ in SCHEMA:
+            sql = [
+                conn.execute(f"SELECT sql FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+                for schema in ('main', 'ref')
+            ]
+            if sql[0] != sql[1]:
+                differences.append(f"{table_name} : schéma différent")
+
+            counts = [conn.execute(f"SELECT COUNT(*) FROM {schema}.{table_name}").fetchone()[0] for schema in ('main', 'ref')]
+            if counts[0] != counts[1]:
+                differences.append(f"{table_name} : {counts[0]} lignes au lieu de {counts[1]}")
+
+            only_main = conn.execute(f"SELECT COUNT(*) FROM (SELECT * FROM main.{table_name} EXCEPT SELECT * FROM ref.{table_name})").fetchone()[0]
+            only_ref = conn.execute(f"SELECT COUNT(*) FROM (SELECT * FROM ref.{table_name} EXCEPT SELECT * FROM main.{table_name})").fetchone()[0]
+            if only_main or only_ref:
+                differences.append(f"{table_name} : {only_main} lignes absentes de la référence, {only_ref} lignes manquantes")
+    finally:
+        conn.execute("DETACH DATABASE ref")
+    return differences
+
+
+# =========================================================================
+# IMPORT PARALLÈLE
+# Le processus principal découpe les CSV en blocs de lignes brutes ; un pool
+# de processus les parse avec pandas, renomme les colonnes, retire les
+# orphelins et les doublons, puis renvoie des tuples prêts à insérer. Le
+# processus principal est le seul écrivain SQLite et insère les blocs dans
+# l'ordre du fichier (le premier doublon lu est celui qui est gardé).
+# Un champ entre guillemets peut contenir des retours à la ligne : un bloc
+# n'est coupé qu'entre deux enregistrements (nombre de guillemets pair).
+# =========================================================================
+
+CSV_DIR = './cineexplorer/data/csv'
+BLOCK_LINES = 50000
+# Blocs envoyés au pool et pas encore écrits, par processus : borne la mémoire
+# quand le parsing va plus vite que l'unique écrivain SQLite
+BLOCKS_IN_FLIGHT_PER_WORKER = 2
+
+# MOVIE et PERSON d'abord : leurs identifiants servent à filtrer les orphelins des autres tables
+PHASES = [
+    {
+        'movies': 'MOVIE',   # Mid
+        'persons': 'PERSON', # Pid
+    },
+    {
+        'ratings': 'RATING',
+        'genres': "GENRE",
+        'episodes': 'EPISODE',
+
+        'principals': 'PRINCIPAL',
+        'characters': 'CHARACTER',
+        'directors': 'DIRECTOR',
+        'writers': 'WRITER',
+        'professions': 'PROFESSION',
+
+        'knownformovies': 'KNOWN_FOR',
+        'titles': 'TITLE',
+    },
+]
+
+# Identifiants valides, transmis aux processus du pool à leur création.
+# Tableaux triés d'entiers (tt0111161 -> 111161) : 8 octets par identifiant
+# au lieu d'un set de chaînes Python.
+valid_mids = None
+valid_pids = None
+
+
+def id_codes(values):
+    # 'tt0111161' (ou 111161 déjà converti) -> 111161 ; NaN pour une valeur absente ou mal formée
+    return pd.to_numeric(values.astype(str).str.replace(r'^(tt|nm)', '', regex=True), errors='coerce')
+
+
+def is_valid(values, valid_ids):
+    codes = id_codes(values).to_numpy(dtype='float64')
+    positions = np.searchsorted(valid_ids, codes)
+    positions[positions >= len(valid_ids)] = 0
+    return (valid_ids[positions] == codes) if len(valid_ids) else np.zeros(len(codes), dtype=bool)
+
+
+def init_worker(mids, pids, integer_ids=False):
+    global valid_mids, valid_pids, INTEGER_IDS
+    valid_mids = mids
+    valid_pids = pids
+    INTEGER_IDS = integer_ids
+
+
+def parse_block(task):
+    """Parse et nettoie un bloc de lignes (exécuté dans un processus du pool)."""
+    table_name, header, lines = task
+    chunk = pd.read_csv(io.StringIO(header + lines), low_memory=False)
+
+    #Renome les colonnes
+    chunk.columns = [col[2:-3] for col in chunk.columns]
+
+    #Vérifie que les pids / mids existent
+    orphans = 0
+    for column, valid_ids in (('mid', valid_mids), ('pid', valid_pids), ('parentMid', valid_mids)):
+        if column in chunk.columns and valid_ids is not None:
             len_chunk = len(chunk)
-            chunk = chunk[chunk['parentMid'].isin(valid_mids)]
-            orphelin_supprime += len_chunk - len(chunk)
-        except:
-            pass
-
-        # Remplacement des valeurs NaN par None pour SQL
-        chunk = chunk.where(pd.notnull(chunk), None)
-
-        #Enleve les dupliqués
-        chunk = chunk.drop_duplicates(subset=chunk.columns)
-
-
-        chunk.to_sql(table_name, conn, if_exists='append', index=False)
-        ligne_ajoute += len(chunk)
-
-    end_time = time.time()
-
-        
-
-
-tables = {
-    'movies': 'MOVIE',   # Mid
-    'persons': 'PERSON', # Pid
-
-    'ratings': 'RATING',
-    'genres': "GENRE",
-    'episodes': 'EPISODE',
+            chunk = chunk[is_valid(chunk[column], valid_ids)]
+            orphans += len_chunk - len(chunk)
+
+    if INTEGER_IDS:
+        for column in ID_COLUMNS:
+            if column in chunk.columns:
+                chunk[column] = id_codes(chunk[column]).astype('Int64')
+
+    #Enleve les dupliqués
+    chunk = chunk.drop_duplicates(subset=chunk.columns)
+
+    # Remplacement des valeurs NaN par None pour SQL (types Python natifs pour sqlite3)
+    chunk = chunk.astype(object).where(pd.notnull(chunk), None)
+
+    return table_name, list(chunk.columns), list(chunk.itertuples(index=False, name=None)), orphans
+
+
+def read_blocks(csv_name, table_name, block_lines=BLOCK_LINES):
+    """Découpe un CSV en blocs de lignes brutes, l'en-tête répété dans chaque tâche.
+
+    Les guillemets doublés ("") d'un champ comptent pour deux : tant que le
+    nombre de guillemets lus est impair, la ligne suivante continue le même
+    enregistrement et le bloc n'est pas coupé.
+    """
+    csv_path = f'{CSV_DIR}/{csv_name}.csv'
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        header = f.readline()
+        lines = []
+        in_quotes = False
+        for line in f:
+            lines.append(line)
+            if line.count('"') % 2:
+                in_quotes = not in_quotes
+            if len(lines) >= block_lines and not in_quotes:
+                yield table_name, header, ''.join(lines)
+                lines = []
+        if in_quotes:
+            raise ValueError(f"{csv_path} : guillemet non fermé en fin de fichier")
+        if lines:
+            yield table_name, header, ''.join(lines)
+
+
+def all_blocks(tables):
+    for csv_name, table_name in tables.items():
+        print(f"-> Lecture de {csv_name}.csv pour la table {table_name}...")
+        yield from read_blocks(csv_name, table_name)
+
+
+def bounded_imap(pool, func, tasks, window):
+    """Comme pool.imap (résultats dans l'ordre), avec au plus window tâches en cours.
+
+    pool.imap lit toutes les tâches d'avance et accumule les résultats que
+    l'écrivain n'a pas encore consommés ; ici on ne soumet un bloc que
+    lorsqu'un autre a été rendu.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def import_phase(conn, tables, workers, mids=None, pids=None, bulk=False, suffix=''):
+    """Importe un groupe de tables : parsing dans le pool, écriture ici seulement.
+
+    Mode normal : une transaction par bloc. Mode bulk : une seule transaction
+    pour tout le groupe. suffix redirige l'écriture vers des tables de
+    staging (mode incrémental).
+    """
+    stats = {table_name: {'rows': 0, 'orphans': 0, 'start': None, 'end': None} for table_name in tables.values()}
+    ids = {'MOVIE': [], 'PERSON': []}
+
+    with Pool(workers, initializer=init_worker, initargs=(mids, pids, INTEGER_IDS)) as pool:
+        blocks = bounded_imap(pool, parse_block, all_blocks(tables), workers * BLOCKS_IN_FLIGHT_PER_WORKER)
+        for table_name, columns, rows, orphans in blocks:
+            table_stats = stats[table_name]
+            if table_stats['start'] is None:
+                table_stats['start'] = time.time()
+
+            placeholders = ', '.join('?' for _ in columns)
+            cursor = conn.executemany(
+                f"INSERT OR IGNORE INTO {table_name}{suffix} ({', '.join(columns)}) VALUES ({placeholders})", rows
+            )
+            table_stats['rows'] += cursor.rowcount
+            table_stats['orphans'] += orphans
+            if not bulk:
+                conn.commit()
+            table_stats['end'] = time.time()
+
+            # Identifiants des entités, pour filtrer les orphelins de la phase suivante
+            if table_name in ids:
+                key = columns.index('mid' if table_name == 'MOVIE' else 'pid')
+                ids[table_name].append(id_codes(pd.Series([row[key] for row in rows])).dropna().to_numpy())
+    conn.commit()
 
-    'principals': 'PRINCIPAL',
-    'characters': 'CHARACTER',
-    'directors': 'DIRECTOR',
-    'writers': 'WRITER',
-    'professions': 'PROFESSION',
+    for table_name, table_stats in stats.items():
+        duration = (table_stats['end'] or 0) - (table_stats['start'] or 0)
+        rate = table_stats['rows'] / duration if duration > 0 else table_stats['rows']
+        print(f"{table_name:<12} : {table_stats['rows']:>10} lignes, {table_stats['orphans']:>8} orphelins, {rate:>10.0f} lignes/s")
+
+    def sorted_ids(parts):
+        return np.unique(np.concatenate(parts)).astype('float64') if parts else np.array([], dtype='float64')
+
+    return stats, sorted_ids(ids['MOVIE']), sorted_ids(ids['PERSON'])
+
+
+# =========================================================================
+# IMPORT INCRÉMENTAL
+# Chaque CSV est identifié par son empreinte (taille, date, SHA-256) rangée
+# dans IMPORT_FILES. Seuls les fichiers modifiés sont chargés, dans des
+# tables de staging, puis comparés à la table en place : les lignes
+# nouvelles ou modifiées sont réécrites, les clés disparues supprimées, et
+# chaque opération est notée dans CHANGE_LOG pour que migrate_flat.py
+# --incremental ne renvoie à MongoDB que ces lignes.
+# =========================================================================
+
+SCHEMA_BY_TABLE = {table_name: (columns, primary_key, foreign_keys) for table_name, columns, primary_key, foreign_keys in SCHEMA}
+
+def file_fingerprint(csv_name):
+    csv_path = f'{CSV_DIR}/{csv_name}.csv'
+    stat = os.stat(csv_path)
+    sha = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha.hexdigest()}
+
+
+def create_meta_tables(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS IMPORT_FILES (csv_name TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha256 TEXT)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS CHANGE_LOG (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            generation INTEGER,
+            table_name TEXT,
+            op TEXT,
+            key TEXT
+        )
+    """)
 
-    'knownformovies': 'KNOWN_FOR',
-    'titles': 'TITLE',
-}
 
-#Extrait les mids du fichier csv movies
-valid_mids = set(pd.read_csv('./cineexplorer/data/csv/movies.csv', usecols=[0]).iloc[:, 0])
+def record_fingerprints(conn, fingerprints):
+    create_meta_tables(conn)
+    conn.executemany(
+        "INSERT OR REPLACE INTO IMPORT_FILES (csv_name, size, mtime, sha256) VALUES (?, ?, ?, ?)",
+        [(csv_name, f['size'], f['mtime'], f['sha256']) for csv_name, f in fingerprints.items()]
+    )
+    conn.commit()
 
-#Extrait les pids du fichier csv persons
-valid_pids = set(pd.read_csv('./cineexplorer/data/csv/persons.csv', usecols=[0]).iloc[:, 0])
 
+def changed_files(conn, csv_names):
+    """Renvoie les empreintes des fichiers modifiés depuis le dernier import.
+
+    Taille et date identiques : fichier considéré inchangé sans le relire.
+    """
+    known = {row[0]: row[1:] for row in conn.execute("SELECT csv_name, size, mtime, sha256 FROM IMPORT_FILES")}
+    changed = {}
+    for csv_name in csv_names:
+        csv_path = f'{CSV_DIR}/{csv_name}.csv'
+        stat = os.stat(csv_path)
+        previous = known.get(csv_name)
+        if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+            continue
+        fingerprint = file_fingerprint(csv_name)
+        if previous and previous[2] == fingerprint['sha256']:
+            # Contenu identique (fichier simplement recopié) : on met juste la date à jour
+            record_fingerprints(conn, {csv_name: fingerprint})
+            continue
+        changed[csv_name] = fingerprint
+    return changed
+
+
+def id_layout(conn):
+    try:
+        row = conn.execute("SELECT value FROM IMPORT_META WHERE key = 'integer_ids'").fetchone()
+    except sqlite3.OperationalError:
+        return 'text'
+    return 'integer' if row and row[0] else 'text'
+
+
+def load_ids(conn, table_name, column):
+    values = pd.Series([row[0] for row in conn.execute(f"SELECT {column} FROM {table_name}")], dtype=object)
+    return np.unique(id_codes(values).dropna().to_numpy()).astype('float64')
+
+
+def log_changes(conn, generation, table_name, op, primary_key, source, where):
+    key = ', '.join(f"'{column}', {column}" for column in primary_key)
+    return conn.execute(f"""
+        INSERT INTO CHANGE_LOG (generation, table_name, op, key)
+        SELECT ?, ?, ?, json_object({key}) FROM {source} WHERE {where}
+    """, (generation, table_name, op)).rowcount
+
+
+def apply_staging(conn, table_name, generation):
+    """Applique {table}_STAGE à la table : upserts et suppressions, notés dans CHANGE_LOG."""
+    columns, primary_key, _ = SCHEMA_BY_TABLE[table_name]
+    staging = f"{table_name}_STAGE"
+
+    # Clés absentes du nouveau fichier (IS : une colonne de clé peut être NULL)
+    same_key = ' AND '.join(f"s.{column} IS {table_name}.{column}" for column in primary_key)
+    gone = f"NOT EXISTS (SELECT 1 FROM {staging} s WHERE {same_key})"
+    deletes = log_changes(conn, generation, table_name, 'delete', primary_key, table_name, gone)
+    conn.execute(f"DELETE FROM {table_name} WHERE {gone}")
+
+    # Lignes nouvelles ou modifiées
+    conn.execute(f"CREATE TEMP TABLE CHANGED AS SELECT * FROM {staging} EXCEPT SELECT * FROM {table_name}")
+    upserts = log_changes(conn, generation, table_name, 'upsert', primary_key, 'CHANGED', '1')
+    conn.execute(f"INSERT OR REPLACE INTO {table_name} SELECT * FROM CHANGED")
+    conn.execute("DROP TABLE CHANGED")
+    conn.execute(f"DROP TABLE {staging}")
+    conn.commit()
+    return upserts, deletes
+
+
+def remove_orphans(conn, table_name, generation):
+    """Supprime les lignes d'une table non réimportée dont le film ou la personne a disparu."""
+    columns, primary_key, _ = SCHEMA_BY_TABLE[table_name]
+    names = [column.split()[0] for column in columns]
+    conditions = [
+        f"({column} IS NOT NULL AND {column} NOT IN (SELECT {'pid' if target == 'PERSON' else 'mid'} FROM {target}))"
+        for column, target in ID_COLUMNS.items() if column in names and table_name != target
+    ]
+    if not conditions:
+        return 0
+    where = ' OR '.join(conditions)
+    deletes = log_changes(conn, generation, table_name, 'delete', primary_key, table_name, where)
+    conn.execute(f"DELETE FROM {table_name} WHERE {where}")
+    conn.commit()
+    return deletes
+
+
+def incremental_import(conn, workers):
+    """Réimporte uniquement les CSV modifiés ; renvoie les tables touchées."""
+    create_meta_tables(conn)
+    try:
+        generation = (conn.execute("SELECT value FROM IMPORT_META WHERE key = 'generation'").fetchone() or (0,))[0] + 1
+    except sqlite3.OperationalError:
+        generation = 1
+    touched = set()
+
+    for index, tables in enumerate(PHASES):
+        changed = changed_files(conn, tables)
+        reimported = {tables[csv_name] for csv_name in changed}
+
+        if changed:
+            for table_name in reimported:
+                columns, primary_key, _ = SCHEMA_BY_TABLE[table_name]
+                conn.execute(f"DROP TABLE IF EXISTS {table_name}_STAGE")
+                conn.execute(table_ddl(f"{table_name}_STAGE", columns, primary_key, []))
+
+            # Identifiants valides : ceux de la base, MOVIE et PERSON étant déjà à jour en phase 2
+            mids = load_ids(conn, 'MOVIE', 'mid') if index else None
+            pids = load_ids(conn, 'PERSON', 'pid') if index else None
+            import_phase(conn, {csv_name: tables[csv_name] for csv_name in changed}, workers, mids, pids, suffix='_STAGE')
+
+            for table_name in reimported:
+                upserts, deletes = apply_staging(conn, table_name, generation)
+                if upserts or deletes:
+                    touched.add(table_name)
+                print(f"{table_name:<12} : {upserts:>8} ajouts/modifications, {deletes:>8} suppressions")
+            record_fingerprints(conn, changed)
+
+        # Films ou personnes supprimés : nettoyage des tables dépendantes non réimportées
+        if index and touched & {'MOVIE', 'PERSON'}:
+            for table_name in set(tables.values()) - reimported:
+                deletes = remove_orphans(conn, table_name, generation)
+                if deletes:
+                    touched.add(table_name)
+                    print(f"{table_name:<12} : {deletes:>8} orphelins supprimés")
+
+    return touched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import des CSV IMDb dans imdb.db")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Nombre de processus de parsing")
+    parser.add_argument('--database', default=DATABASE_FILE, help="Base SQLite à créer")
+    parser.add_argument('--bulk', action='store_true', help="Chargement sans clés ni journal, clés construites à la fin")
+    parser.add_argument('--incremental', action='store_true', help="Ne réimporte que les CSV modifiés depuis le dernier import")
+    parser.add_argument('--integer-ids', action='store_true', help="Stocke tt0111161 / nm0000158 en entiers (IMDB_ID_STORAGE = 'integer')")
+    parser.add_argument('--verify', metavar='REFERENCE_DB', help="Compare le résultat à une base issue d'un import normal")
+    args = parser.parse_args()
+
+    global INTEGER_IDS
+    INTEGER_IDS = args.integer_ids
 
-orphelin_supprime = 0
-ligne_ajoute = 0
-conn = sqlite3.connect(DATABASE_FILE)
-for key, values in tables.items():
-    Import_Data(conn, key, values)
+    start_time = time.time()
+    if args.incremental and os.path.exists(args.database):
+        conn = sqlite3.connect(args.database)
+        # Le format des identifiants est celui de la base existante
+        INTEGER_IDS = id_layout(conn) == 'integer'
+        touched = incremental_import(conn, args.workers)
+        print(f"Import incrémental terminé en {time.time() - start_time:.1f} s : {len(touched)} tables modifiées")
+        if not touched:
+            conn.close()
+            return
+    else:
+        if args.incremental:
+            print(f"{args.database} absente : import complet")
+        create_base(args.database, bulk=args.bulk)
+
+        conn = sqlite3.connect(args.database)
+        if args.bulk:
+            for pragma in BULK_PRAGMAS:
+                conn.execute(pragma)
+
+        stats, mids, pids = import_phase(conn, PHASES[0], args.workers, bulk=args.bulk)
+        stats.update(import_phase(conn, PHASES[1], args.workers, mids, pids, bulk=args.bulk)[0])
+        if args.bulk:
+            finalize_bulk(conn)
+
+        print(f"Nombre d'orphelin supprimés : {sum(s['orphans'] for s in stats.values())}")
+        print(f"Nombre de lignes ajoutées : {sum(s['rows'] for s in stats.values())}")
+        print(f"Import terminé en {time.time() - start_time:.1f} s")
+
+        # Empreintes des fichiers importés, point de départ du prochain import incrémental
+        record_fingerprints(conn, {csv_name: file_fingerprint(csv_name) for tables in PHASES for csv_name in tables})
+
+    if args.verify:
+        differences = verify_against(conn, args.verify)
+        for difference in differences:
+            print(f"DIFFÉRENCE {difference}")
+        print("Vérification : identique à la référence" if not differences else f"Vérification : {len(differences)} différences")
+
+    # Table dénormalisée du catalogue, à reconstruire après chaque import
+    browse_rows = rebuild_movie_browse(conn)
+    print(f"MOVIE_BROWSE reconstruite : {browse_rows} lignes")
+
+    # Index du catalogue (déclarés dans movies/services/index_manager.py)
+    created = ensure_indexes(conn)
+    print(f"Index du catalogue créés : {len(created)}")
+
+    # Compteurs du tableau de bord recalculés une fois pour toutes après l'import
+    refresh_dashboard_stats(conn)
+    print("Statistiques du tableau de bord mises à jour")
+
+    # Nombre de lignes par table, lu par SQLiteService.get_all_counts sans COUNT(*)
+    refresh_row_counts(conn)
+    print("Compteurs de lignes (ROW_COUNTS) mis à jour")
+
+    # Signale aux processus du site que les listes de référence sont à relire
+    generation = bump_import_generation(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO IMPORT_META (key, value) VALUES ('integer_ids', ?)", (1 if INTEGER_IDS else 0,)
+    )
+    conn.commit()
+    print(f"Génération d'import : {generation} (identifiants {'entiers' if INTEGER_IDS else 'texte'})")
+    conn.close()
 
 
-print(f"Nombre d'orphelin supprimés : {orphelin_supprime}")
-print(f"Nombre de lignes ajoutées : {ligne_ajoute}")
-conn.close()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
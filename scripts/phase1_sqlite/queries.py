@@ -1,8 +1,10 @@
 import pandas as pd
-import sqlite3
-import time
 import os
 
+# Les neuf requêtes d'analyse, version SQLite. Chacune renvoie son DataFrame ;
+# les mesures se font avec le harnais commun :
+#   python scripts/benchmark.py --backend sqlite [--compare-indexes]
+
 
 def Filmographie(name):
 
@@ -20,8 +22,7 @@ def Filmographie(name):
         ORDER BY m.startYear DESC;
     """
 
-    df = pd.read_sql_query(query, conn, params=(name,))
-    print(df.head(5))
+    return pd.read_sql_query(query, conn, params=(name,))
 
 
 def Top_Film(genre, debut, fin, N):
@@ -39,8 +40,7 @@ def Top_Film(genre, debut, fin, N):
         LIMIT ?;
     """
 
-    df = pd.read_sql_query(query, conn, params=(genre, debut, fin, N,))
-    print(df.head(5))
+    return pd.read_sql_query(query, conn, params=(genre, debut, fin, N,))
 
 
 def Multi_Role():
@@ -58,8 +58,7 @@ def Multi_Role():
         ORDER BY Nb_Roles DESC, Acteur ASC;
     """
 
-    df = pd.read_sql_query(query, conn)
-    print(df.head(5))
+    return pd.read_sql_query(query, conn)
 
 
 def Collaboration(actor):
@@ -81,8 +80,7 @@ def Collaboration(actor):
     ORDER BY Nombre_de_Films DESC, Realisateur ASC;
     """
 
-    df = pd.read_sql_query(query, conn, params=(actor,))
-    print(df.head(5))
+    return pd.read_sql_query(query, conn, params=(actor,))
 
 
 def Genre_Populaire():
@@ -101,8 +99,7 @@ def Genre_Populaire():
     ORDER BY Note_Moyenne DESC;
     """
 
-    df = pd.read_sql_query(query, conn)
-    print(df.head(5))
+    return pd.read_sql_query(query, conn)
 
 
 
@@ -131,8 +128,7 @@ def Evolution_Carriere(acteur_nom):
     ORDER BY Decennie ASC;
     """
     
-    df = pd.read_sql_query(query, conn, params=(acteur_nom,))
-    print(df.head(5))
+    return pd.read_sql_query(query, conn, params=(acteur_nom,))
 
 
 def Meilleur_Film_Par_Genre():
@@ -157,8 +153,7 @@ def Meilleur_Film_Par_Genre():
     ORDER BY Genre ASC, Rang ASC;
     """
     
-    df = pd.read_sql_query(query, conn)
-    print(df.head(5))
+    return pd.read_sql_query(query, conn)
 
 
 def Carriere_Propulse():
@@ -201,14 +196,13 @@ def Carriere_Propulse():
     ORDER BY b.Nom ASC;
     """
     
-    df = pd.read_sql_query(query, conn)
-    print(df.head(5))
+    return pd.read_sql_query(query, conn)
 
 
 #Les 3 films notés > 9 avec le nombre d'acteurs ayant participé.
 def Derniere():
     query ="""
-        EXPLAIN QUERY PLAN SELECT 
+        SELECT 
             m.primaryTitle AS Film,
             r.averageRating AS Note,
             COUNT(DISTINCT pr.pid) AS Nombre_Total_Personnes
@@ -221,104 +215,56 @@ def Derniere():
         ORDER BY r.averageRating DESC
         LIMIT 3;
     """
-    df = pd.read_sql_query(query, conn)
-    print(df.head(5))
-    
-
+    return pd.read_sql_query(query, conn)
 
 
+# Connexion ouverte par le harnais de mesure (scripts/benchmark.py --backend sqlite)
 DB_PATH = './data/imdb.db'
-conn = sqlite3.connect(DB_PATH)
+conn = None
+
+# Index de la comparaison : (nom, table, colonne)
+INDEXES = [
+    ("idx_person_name", "PERSON", "primaryName"),
+    ("idx_char_pid", "CHARACTER", "pid"),
+    ("idx_char_mid", "CHARACTER", "mid"),
+    ("idx_principals_mid", "PRINCIPAL", "mid"),
+    ("idx_movie_year", "MOVIE", "startYear"),
+    ("idx_rating_score", "RATING", "averageRating"),
+    ("idx_genre_name", "GENRE", "genre"),
+]
+
+# Index créés par Create_Indexes, notés dans la base : Fin_Index ne supprime qu'eux.
+# Un index de la liste déjà présent avant (créé à la main, par l'import...) reste en place.
+OWNED_INDEXES = "BENCHMARK_INDEXES"
+
 
 def get_db_size():
     return os.path.getsize(DB_PATH) / (1024 * 1024)  # Taille en Mo
 
 
 def Fin_Index():
-    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {OWNED_INDEXES} (name TEXT PRIMARY KEY)")
+    owned = [row[0] for row in cursor.execute(f"SELECT name FROM {OWNED_INDEXES}").fetchall()]
 
-    # Récupérer tous les noms d'index créés par l'utilisateur
-    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex%';")
-    indexes = cursor.fetchall()
-
-    for idx in indexes:
-        index_name = idx[0]
+    for index_name in owned:
         print(f"Suppression de l'index : {index_name}")
         cursor.execute(f"DROP INDEX IF EXISTS {index_name};")
 
+    cursor.execute(f"DROP TABLE {OWNED_INDEXES}")
     conn.commit()
-    print("Tous les index personnalisés ont été supprimés.")
-
-
-
-# --- Vos fonctions de requêtes restent identiques ---
-# (Pensez juste à enlever "EXPLAIN QUERY PLAN" dans la fonction Derniere 
-# pour mesurer le temps réel d'exécution)
-
-def run_benchmarks_detailed():
-    results = {}
-    tasks = [
-        (Filmographie, ["Tom Hanks"]),
-        (Top_Film, ["Comedy", 1980, 2000, 10]),
-        (Multi_Role, []),
-        (Collaboration, ["Tom Hanks"]),
-        (Genre_Populaire, []),
-        (Evolution_Carriere, ["Clint Eastwood"]),
-        (Meilleur_Film_Par_Genre, []),
-        (Carriere_Propulse, []),
-        (Derniere, [])
-    ]
-    
-    for func, args in tasks:
-        s = time.time()
-        func(*args) if args else func()
-        e = time.time()
-        # On stocke le résultat en millisecondes
-        results[func.__name__] = round((e - s) * 1000, 2)
-        
-    return results
-
-# --- Exécution du Benchmark ---
-
-# 1. Nettoyage et Mesure Sans Index
-Fin_Index()
-conn.execute("VACUUM") # Pour réinitialiser la taille réelle du fichier
-size_before = get_db_size()
-print("Calcul des temps sans index...")
-temps_sans = run_benchmarks_detailed()
-
-# 2. Création des Index
-print("Création des index...")
-conn.execute("CREATE INDEX IF NOT EXISTS idx_person_name ON PERSON(primaryName);")
-conn.execute("CREATE INDEX IF NOT EXISTS idx_char_pid ON CHARACTER(pid);")
-conn.execute("CREATE INDEX IF NOT EXISTS idx_char_mid ON CHARACTER(mid);")
-conn.execute("CREATE INDEX IF NOT EXISTS idx_principals_mid ON PRINCIPAL(mid);")
-conn.execute("CREATE INDEX IF NOT EXISTS idx_movie_year ON MOVIE(startYear);")
-conn.execute("CREATE INDEX IF NOT EXISTS idx_rating_score ON RATING(averageRating);")
-conn.execute("CREATE INDEX IF NOT EXISTS idx_genre_name ON GENRE(genre);")
-conn.commit()
-
-# 3. Mesure Avec Index
-size_after = get_db_size()
-print("Calcul des temps avec index...")
-temps_avec = run_benchmarks_detailed()
-
-# --- 4. Affichage du Tableau Final ---
-
-print("\n" + "="*85)
-print(f"{'Requêtes':<25} | {'Sans index (ms)':<15} | {'Avec index (ms)':<15} | {'Gain (%)':<10}")
-print("-" * 85)
-
-for nom in temps_sans.keys():
-    t_sans = temps_sans[nom]
-    t_avec = temps_avec[nom]
-    
-    # Calcul du gain en pourcentage
-    # Si t_avec est proche de 0, le gain tend vers 100%
-    gain = round(((t_sans - t_avec) / t_sans) * 100, 2) if t_sans > 0 else 0
-    
-    print(f"{nom:<25} | {t_sans:<15} | {t_avec:<15} | {gain:<10}%")
-
-print("="*85)
-print(f"Taille de la base : {round(size_before, 2)} Mo (Sans) -> {round(size_after, 2)} Mo (Avec)")
\ No newline at end of file
+    if owned:
+        conn.execute("VACUUM") # Pour réinitialiser la taille réelle du fichier
+    print("Index de la comparaison supprimés.")
+
+
+def Create_Indexes():
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {OWNED_INDEXES} (name TEXT PRIMARY KEY)")
+    for name, table, column in INDEXES:
+        if name in existing:
+            continue
+        conn.execute(f"CREATE INDEX {name} ON {table}({column});")
+        conn.execute(f"INSERT OR IGNORE INTO {OWNED_INDEXES} (name) VALUES (?)", (name,))
+    conn.commit()
+    print("Index SQLite créés.")
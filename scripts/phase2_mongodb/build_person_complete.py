@@ -0,0 +1,72 @@
+import time
+from pymongo import MongoClient, ASCENDING
+
+# Construit PERSON_COMPLETE, le pendant de MOVIE_COMPLETE côté personnes :
+# un document par personne avec toute sa filmographie (titre, année, note,
+# rôle et personnages), pour servir la page /actor/<nconst>/ en une lecture.
+#
+# Il est dérivé de MOVIE_COMPLETE (dont les cast/directors/crew contiennent
+# déjà nom, rôle et personnages) : à relancer après migrate_structured.py.
+# Construit dans une collection temporaire puis renommé, comme SEARCH_INDEX.
+
+MEMBERS = ["cast", "directors", "crew"]
+
+
+def person_complete_pipeline(target):
+    return [
+        {"$project": {
+            "_id": 0,
+            "mid": "$_id",
+            "title": 1,
+            "titleType": 1,
+            "year": 1,
+            "rating": 1,
+            "members": {"$concatArrays": [{"$ifNull": [f"${field}", []]} for field in MEMBERS]},
+        }},
+        {"$unwind": "$members"},
+        # Tri avant regroupement : chaque filmographie sort du plus récent au plus ancien
+        {"$sort": {"members.person_id": 1, "year": -1, "mid": 1}},
+        {"$group": {
+            "_id": "$members.person_id",
+            "name": {"$first": "$members.name"},
+            "credits": {"$push": {
+                "mid": "$mid",
+                "title": "$title",
+                "titleType": "$titleType",
+                "year": "$year",
+                "rating": "$rating.average",
+                "votes": "$rating.votes",
+                "category": "$members.category",
+                "characters": "$members.characters",
+            }},
+        }},
+        {"$out": target},
+    ]
+
+
+def build_person_complete():
+    start_time = time.time()
+    db["PERSON_COMPLETE_NEW"].drop()
+
+    print("Regroupement des crédits de MOVIE_COMPLETE par personne...")
+    db["MOVIE_COMPLETE"].aggregate(person_complete_pipeline("PERSON_COMPLETE_NEW"), allowDiskUse=True)
+    total = db["PERSON_COMPLETE_NEW"].count_documents({})
+    print(f"✅ {total} personnes")
+
+    # Recherche par nom pour les requêtes d'analyse (Filmographie, Evolution_Carriere)
+    db["PERSON_COMPLETE_NEW"].create_index([("name", ASCENDING)])
+
+    # Bascule atomique : la page acteur reste disponible pendant la reconstruction
+    db["PERSON_COMPLETE_NEW"].rename("PERSON_COMPLETE", dropTarget=True)
+    print(f"PERSON_COMPLETE construit en {time.time() - start_time:.2f}s")
+    return total
+
+
+if __name__ == "__main__":
+    mongo_uri = "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+    mongo_client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    db = mongo_client['MongoDB']
+
+    build_person_complete()
+
+    mongo_client.close()
@@ -0,0 +1,123 @@
+import os
+import sys
+import sqlite3
+import time
+from collections import Counter
+from pymongo import MongoClient, ASCENDING, DESCENDING
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from movies.services.text import tokenize
+
+# Construit la collection SEARCH_INDEX utilisée par la page /search :
+# un document par film ou personne, avec ses mots normalisés (index multikey)
+# et sa popularité (numVotes) pour classer les résultats.
+#
+# L'index est construit dans une collection temporaire puis renommé :
+# la recherche reste disponible pendant la reconstruction.
+#
+# SEARCH_TOKENS recense les mots de l'index ("movie:amelie", votes cumulés) :
+# la recherche y trouve les quelques mots les plus populaires commençant par
+# le dernier mot tapé, au lieu d'une regex de préfixe sur SEARCH_INDEX.
+
+
+def movie_docs(sqlite_cur):
+    sqlite_cur.execute("""
+        SELECT m.mid, m.primaryTitle, m.originalTitle, m.startYear, m.titleType, COALESCE(r.numVotes, 0)
+        FROM MOVIE m LEFT JOIN RATING r ON m.mid = r.mid
+    """)
+    for mid, title, original, year, title_type, votes in sqlite_cur:
+        tokens = set(tokenize(title)) | set(tokenize(original))
+        if tokens:
+            yield {
+                "_id": f"movie:{mid}",
+                "kind": "movie",
+                "tokens": sorted(tokens),
+                "votes": votes,
+                "mid": mid,
+                "primaryTitle": title,
+                "startYear": year,
+                "titleType": title_type,
+            }
+
+
+def person_docs(sqlite_cur):
+    # Popularité d'une personne : somme des votes des films pour lesquels elle est connue
+    sqlite_cur.execute("""
+        SELECT p.pid, p.primaryName, p.birthYear, COALESCE(v.votes, 0)
+        FROM PERSON p
+        LEFT JOIN (
+            SELECT k.pid, SUM(r.numVotes) AS votes
+            FROM KNOWN_FOR k JOIN RATING r ON k.mid = r.mid
+            GROUP BY k.pid
+        ) v ON p.pid = v.pid
+    """)
+    for pid, name, birth_year, votes in sqlite_cur:
+        tokens = set(tokenize(name))
+        if tokens:
+            yield {
+                "_id": f"person:{pid}",
+                "kind": "person",
+                "tokens": sorted(tokens),
+                "votes": votes,
+                "pid": pid,
+                "primaryName": name,
+                "birthYear": birth_year,
+            }
+
+
+def build_search_index(batch_size=10000):
+    start_time = time.time()
+    tmp = db["SEARCH_INDEX_NEW"]
+    tmp.drop()
+    vocabulary = Counter()
+
+    for label, docs in [("films", movie_docs), ("personnes", person_docs)]:
+        batch = []
+        inserted = 0
+        for doc in docs(sqlite_conn.cursor()):
+            for token in doc["tokens"]:
+                vocabulary[f"{doc['kind']}:{token}"] += doc["votes"]
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                tmp.insert_many(batch, ordered=False)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            tmp.insert_many(batch, ordered=False)
+            inserted += len(batch)
+        print(f"✅ {inserted} {label} indexés")
+
+    print("Création de l'index sur les mots...")
+    tmp.create_index([("kind", ASCENDING), ("tokens", ASCENDING), ("votes", DESCENDING)])
+
+    tokens = db["SEARCH_TOKENS_NEW"]
+    tokens.drop()
+    entries = [{"_id": key, "votes": votes} for key, votes in vocabulary.items()]
+    for start in range(0, len(entries), batch_size):
+        tokens.insert_many(entries[start:start + batch_size], ordered=False)
+    print(f"✅ {len(entries)} mots distincts")
+
+    # Bascule atomique vers la nouvelle version de l'index
+    tokens.rename("SEARCH_TOKENS", dropTarget=True)
+    tmp.rename("SEARCH_INDEX", dropTarget=True)
+
+    # L'autocomplétion du site (movies/services/autocomplete.py) reconstruit son index à la génération suivante
+    db["META"].update_one(
+        {"_id": "import_generation"},
+        {"$inc": {"collections.SEARCH_INDEX": 1}},
+        upsert=True
+    )
+    print(f"Index de recherche construit en {time.time() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    mongo_uri = "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+    mongo_client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    db = mongo_client['MongoDB']
+
+    sqlite_conn = sqlite3.connect('./cineexplorer/data/imdb.db')
+
+    build_search_index()
+
+    sqlite_conn.close()
+    mongo_client.close()
@@ -0,0 +1,163 @@
+import sqlite3
+import time
+import heapq
+from collections import defaultdict
+from pymongo import MongoClient, ReplaceOne
+
+from migrate_structured import MergeJoin
+
+# Pré-calcul hors-ligne des films similaires (collection SIMILAR, lue par movie_detail)
+#
+# score = (GENRE_WEIGHT * Jaccard(genres) + PRINCIPAL_WEIGHT * Jaccard(principaux)) * note_pondérée / 10
+#
+# Les candidats d'un film sont les films qui partagent au moins un principal,
+# plus les meilleurs films de chacun de ses genres : on évite ainsi de comparer
+# chaque film à tout le catalogue.
+#
+# Seuls les films assez votés (min_votes) sont proposés comme similaires, mais
+# chaque titre de MOVIE reçoit son document, éventuellement vide : movie_detail
+# ne retombe sur l'ancienne suggestion par genre que pour un titre absent de SIMILAR.
+
+GENRE_WEIGHT = 0.6
+PRINCIPAL_WEIGHT = 0.4
+PRIOR_VOTES = 1000         # Nombre de votes "fictifs" de la note bayésienne
+MAX_POSTING = 500          # On ignore les personnes présentes dans trop de films
+TOP_PER_GENRE = 50         # Candidats pris parmi les meilleurs films de chaque genre
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+def load_catalogue(sqlite_conn, min_votes):
+    cur = sqlite_conn.cursor()
+
+    cur.execute("""
+        SELECT m.mid, m.primaryTitle, r.averageRating, r.numVotes
+        FROM MOVIE m JOIN RATING r ON m.mid = r.mid
+        WHERE r.numVotes >= ?
+    """, (min_votes,))
+    movies = {mid: (title, avg, votes) for mid, title, avg, votes in cur}
+
+    # Note bayésienne : évite qu'un film à 10/10 avec 3 votes passe devant tout le monde
+    mean = sum(m[1] for m in movies.values()) / len(movies) if movies else 0
+    weighted = {
+        mid: (votes / (votes + PRIOR_VOTES)) * avg + (PRIOR_VOTES / (votes + PRIOR_VOTES)) * mean
+        for mid, (_, avg, votes) in movies.items()
+    }
+
+    genres = defaultdict(set)
+    cur.execute("SELECT mid, genre FROM GENRE")
+    for mid, genre in cur:
+        if mid in movies:
+            genres[mid].add(genre)
+
+    principals = defaultdict(set)
+    cur.execute("SELECT mid, pid FROM PRINCIPAL")
+    for mid, pid in cur:
+        if mid in movies:
+            principals[mid].add(pid)
+
+    return movies, weighted, genres, principals
+
+
+def sorted_rows(sqlite_conn, sql):
+    # Lignes accessibles par nom (row["mid"]), comme les documents attendus par MergeJoin
+    cursor = sqlite_conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor.execute(sql)
+
+
+def all_titles(sqlite_conn):
+    """(mid, genres, principaux) de chaque titre de MOVIE, lus en un passage.
+
+    Les trois curseurs sont triés par mid (clés primaires) et joints par
+    fusion, sans charger en mémoire les titres hors du catalogue.
+    """
+    genre_rows = MergeJoin(sorted_rows(sqlite_conn, "SELECT mid, genre FROM GENRE ORDER BY mid"))
+    principal_rows = MergeJoin(sorted_rows(sqlite_conn, "SELECT mid, pid FROM PRINCIPAL ORDER BY mid"))
+    for (mid,) in sqlite_conn.execute("SELECT mid FROM MOVIE ORDER BY mid"):
+        yield (mid,
+               {row["genre"] for row in genre_rows.take(mid)},
+               {row["pid"] for row in principal_rows.take(mid)})
+
+
+def compute_similars(k=8, min_votes=100, batch_size=10000):
+    start_time = time.time()
+    print("Chargement du catalogue depuis SQLite...")
+    movies, weighted, genres, principals = load_catalogue(sqlite_conn, min_votes)
+    print(f"{len(movies)} films retenus comme similaires (>= {min_votes} votes)")
+
+    # Index inversés pour la génération de candidats
+    films_by_person = defaultdict(list)
+    for mid, pids in principals.items():
+        for pid in pids:
+            films_by_person[pid].append(mid)
+
+    films_by_genre = defaultdict(list)
+    for mid, gs in genres.items():
+        for g in gs:
+            films_by_genre[g].append(mid)
+    top_by_genre = {
+        g: heapq.nlargest(TOP_PER_GENRE, mids, key=weighted.__getitem__)
+        for g, mids in films_by_genre.items()
+    }
+
+    collection = db["SIMILAR"]
+    batch = []
+    processed = 0
+
+    for mid, my_genres, my_principals in all_titles(sqlite_conn):
+        candidates = set()
+        for pid in my_principals:
+            posting = films_by_person.get(pid, ())
+            if len(posting) <= MAX_POSTING:
+                candidates.update(posting)
+        for g in my_genres:
+            candidates.update(top_by_genre.get(g, ()))
+        candidates.discard(mid)
+
+        scored = []
+        for other in candidates:
+            score = (GENRE_WEIGHT * jaccard(my_genres, genres.get(other, set()))
+                     + PRINCIPAL_WEIGHT * jaccard(my_principals, principals.get(other, set())))
+            if score > 0:
+                scored.append((score * weighted[other] / 10, other))
+
+        best = heapq.nlargest(k, scored)
+        batch.append(ReplaceOne({"_id": mid}, {
+            "_id": mid,
+            "similars": [
+                {"mid": other, "title": movies[other][0], "score": round(score, 4)}
+                for score, other in best
+            ]
+        }, upsert=True))
+
+        if len(batch) >= batch_size:
+            collection.bulk_write(batch, ordered=False)
+            processed += len(batch)
+            batch = []
+            print(f"Progression : {processed} titres traités...")
+
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+        processed += len(batch)
+
+    print(f"{processed} documents SIMILAR écrits")
+    print(f"✅ Similarités calculées en {time.time() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    mongo_uri = "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+    mongo_client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    db = mongo_client['MongoDB']
+
+    sqlite_conn = sqlite3.connect('./cineexplorer/data/imdb.db')
+
+    compute_similars()
+
+    sqlite_conn.close()
+    mongo_client.close()
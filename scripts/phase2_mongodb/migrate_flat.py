@@ -1,44 +1,198 @@
 import sqlite3
-from pymongo import MongoClient
+from pymongo import MongoClient, DeleteOne, ReplaceOne, UpdateOne
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import argparse
+import json
 import os
 import shutil
+import time
+
+# Taille des lots d'écritures envoyés à MongoDB en mode incrémental
+BATCH_SIZE = 1000
+
+# Migration complète : documents par insert_many et nombre d'insert_many en cours en même temps
+BATCH_SIZE_FLAT = 10000
+IN_FLIGHT = 4
+
+# Collections recopiées dans MOVIE_COMPLETE (toutes celles lues par
+# migrate_structured.open_joins), clé contenant le mid : quand on y supprime
+# des lignes, le film est noté dans MOVIE_COMPLETE_DIRTY pour que
+# watch_movie_complete.py le reconstruise (la suppression seule ne dit pas quel film)
+DIRTY = "MOVIE_COMPLETE_DIRTY"
+DIRTY_TABLES = ["MOVIE", "RATING", "GENRE", "PRINCIPAL", "CHARACTER", "TITLE"]
 
 #mongod --dbpath ./data/mongo/standalone/
 
-def migrate_flat():
-    # 1. Connexions
-    # Remplace 'db.sqlite3' par le chemin réel vers ta base Django
-    sqlite_conn.row_factory = sqlite3.Row  # Pour extraire les données sous forme de dict
+def read_batches(cursor, batch_size):
+    # Lecture du curseur par lots : jamais plus d'un lot de lignes SQLite en mémoire
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+
+
+def row_count(table):
+    # Nombre de lignes tenu par import_data.py (ROW_COUNTS), sinon COUNT(*)
+    try:
+        row = sqlite_conn.execute("SELECT row_count FROM ROW_COUNTS WHERE table_name = ?", (table,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    return row[0] if row else sqlite_conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def insert_batch(collection, documents):
+    # ordered=False : le serveur peut paralléliser, un doublon n'arrête pas le lot
+    return len(collection.insert_many(documents, ordered=False).inserted_ids)
+
+
+def migrate_table(table, batch_size, in_flight):
+    """Copie une table par lots, avec au plus in_flight insert_many en cours à la fois.
+
+    La mémoire reste bornée à in_flight + 1 lots, quelle que soit la taille de la table.
+    """
     sqlite_cur = sqlite_conn.cursor()
+    total = row_count(table)
+    if not total:
+        print(f"⚠️ La table {table} est vide.")
+        return 0
+
+    collection = db[table]
+    # On nettoie la collection avant pour éviter les doublons si on relance le script
+    collection.delete_many({})
+
+    inserted = 0
+    start = time.time()
+    last_report = start
+    pending = set()
+    sqlite_cur.execute(f"SELECT * FROM {table}")
+
+    with ThreadPoolExecutor(max_workers=in_flight) as executor:
+        for documents in read_batches(sqlite_cur, batch_size):
+            if len(pending) >= in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                inserted += sum(future.result() for future in done)
+
+            pending.add(executor.submit(insert_batch, collection, documents))
+
+            now = time.time()
+            if now - last_report >= 5:
+                print(f"   {table} : {inserted}/{total} ({inserted / total:.0%}), {inserted / (now - start):.0f} docs/s")
+                last_report = now
+
+        inserted += sum(future.result() for future in pending)
+
+    duration = time.time() - start
+    print(f"✅ {table} : {total} extraits -> {inserted} insérés en {duration:.1f} s ({inserted / duration if duration else inserted:.0f} docs/s)")
+    return inserted
+
+
+def migrate_flat(batch_size=BATCH_SIZE_FLAT, in_flight=IN_FLIGHT):
+    sqlite_conn.row_factory = sqlite3.Row  # Pour extraire les données sous forme de dict
 
     # Liste des tables à migrer (exemples à adapter selon tes modèles)
     tables = ['CHARACTER', 'DIRECTOR', 'EPISODE','GENRE', 'KNOWN_FOR', 'MOVIE','PERSON', 'PRINCIPAL', 'PROFESSION','RATING', 'TITLE', 'WRITER']
 
+    start = time.time()
+    total = 0
     for table in tables:
         print(f"Migration de la table : {table}...")
+        inserted = migrate_table(table, batch_size, in_flight)
+        total += inserted
 
-        # 2. Extraction des données (pas de CSV !)
-        sqlite_cur.execute(f"SELECT * FROM {table}")
-        rows = [dict(row) for row in sqlite_cur.fetchall()]
-
-        if rows:
-            # 3. Insertion dans MongoDB
-            collection = db[table]
-            # On nettoie la collection avant pour éviter les doublons si on relance le script
-            collection.delete_many({}) 
-            
-            result = collection.insert_many(rows)
-            
-            # 4. Vérification des comptages
-            mongo_count = collection.count_documents({})
-            print(f"✅ {table} : {len(rows)} extraits -> {mongo_count} insérés.")
-        else:
-            print(f"⚠️ La table {table} est vide.")
+        if inserted:
+            # Invalide les caches de l'application (page /stats) qui dépendent de cette collection
+            db["META"].update_one(
+                {"_id": "import_generation"},
+                {"$inc": {f"collections.{table}": 1}},
+                upsert=True
+            )
 
+    duration = time.time() - start
+    print(f"\n{total} documents en {duration:.1f} s ({total / duration if duration else total:.0f} docs/s)")
+
+    # Point de départ du prochain --incremental : tout CHANGE_LOG jusqu'ici est déjà dans MongoDB
+    set_synced_generation(sqlite_generation())
 
     print("\nMigration terminée avec succès !")
 
+
+def sqlite_generation():
+    try:
+        row = sqlite_conn.execute("SELECT value FROM IMPORT_META WHERE key = 'generation'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+def set_synced_generation(generation):
+    db["META"].update_one({"_id": "sqlite_sync"}, {"$set": {"generation": generation}}, upsert=True)
+
+
+def migrate_incremental():
+    """Envoie à MongoDB les seules lignes notées dans CHANGE_LOG par import_data.py --incremental."""
+    sync = db["META"].find_one({"_id": "sqlite_sync"})
+    if sync is None:
+        print("Aucune migration complète enregistrée : lancez d'abord migrate_flat.py sans --incremental")
+        return
+    sqlite_conn.row_factory = sqlite3.Row
+
+    # Dernière opération par clé : une ligne modifiée puis supprimée n'est que supprimée
+    latest = {}
+    for row in sqlite_conn.execute(
+        "SELECT table_name, op, key FROM CHANGE_LOG WHERE generation > ? ORDER BY id", (sync["generation"],)
+    ):
+        latest[(row["table_name"], row["key"])] = row["op"]
+
+    operations = {}
+    key_columns = {}
+    dirty_mids = set()
+    for (table, key), op in latest.items():
+        key_filter = json.loads(key)
+        key_columns[table] = list(key_filter)
+        document = None
+        if op == 'upsert':
+            where = ' AND '.join(f"{column} IS ?" for column in key_filter)
+            found = sqlite_conn.execute(f"SELECT * FROM {table} WHERE {where}", tuple(key_filter.values())).fetchone()
+            document = dict(found) if found else None
+        if document is None:
+            operations.setdefault(table, []).append(DeleteOne(key_filter))
+            if table in DIRTY_TABLES:
+                dirty_mids.add(key_filter["mid"])
+        else:
+            operations.setdefault(table, []).append(ReplaceOne(key_filter, document, upsert=True))
+
+    for table, ops in operations.items():
+        # Chaque opération cherche son document par la clé de la table : sans index, un parcours complet
+        db[table].create_index([(column, 1) for column in key_columns[table]])
+        for start in range(0, len(ops), BATCH_SIZE):
+            db[table].bulk_write(ops[start:start + BATCH_SIZE], ordered=False)
+        print(f"✅ {table} : {len(ops)} documents mis à jour")
+
+        # Invalide les caches de l'application (page /stats) qui dépendent de cette collection
+        db["META"].update_one(
+            {"_id": "import_generation"},
+            {"$inc": {f"collections.{table}": 1}},
+            upsert=True
+        )
+
+    # Après les suppressions : le film reconstruit ne contient plus les lignes effacées
+    dirty = [UpdateOne({"_id": mid}, {"$set": {"marked_at": time.time()}}, upsert=True) for mid in dirty_mids]
+    for start in range(0, len(dirty), BATCH_SIZE):
+        db[DIRTY].bulk_write(dirty[start:start + BATCH_SIZE], ordered=False)
+    if dirty:
+        print(f"{len(dirty)} films à reconstruire notés dans {DIRTY}")
+
+    set_synced_generation(sqlite_generation())
+    print(f"\nSynchronisation incrémentale terminée : {sum(len(ops) for ops in operations.values())} documents")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migration des tables SQLite vers les collections MongoDB")
+    parser.add_argument('--incremental', action='store_true', help="N'envoie que les lignes modifiées depuis la dernière migration")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE_FLAT, help="Documents par insert_many")
+    parser.add_argument('--in-flight', type=int, default=IN_FLIGHT, help="Lots insérés en parallèle")
+    args = parser.parse_args()
+
     # Connexion au Replica Set (Ports 27017, 27018, 27019)
     try:
         mongo_uri = "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
@@ -53,7 +207,10 @@ if __name__ == "__main__":
         # Connexion SQLite
         sqlite_conn = sqlite3.connect('./cineexplorer/data/imdb.db')
 
-        migrate_flat()
+        if args.incremental:
+            migrate_incremental()
+        else:
+            migrate_flat(args.batch_size, args.in_flight)
 
         sqlite_conn.close()
         mongo_client.close()
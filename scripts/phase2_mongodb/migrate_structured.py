@@ -1,12 +1,23 @@
 import pymongo
+import argparse
+import os
 import time
+from multiprocessing import Pool
 from pymongo import UpdateOne
 import json
 
 
-client = pymongo.MongoClient("mongodb://localhost:27017/")
+MONGO_URI = "mongodb://localhost:27017/"
+client = pymongo.MongoClient(MONGO_URI)
 db = client["MongoDB"]
 
+# Avancement du constructeur parallèle : une entrée par plage de mid
+PROGRESS = "MOVIE_COMPLETE_PROGRESS"
+
+# Position du change stream suivi par watch_movie_complete.py (resume token)
+STREAM_STATE = "CHANGE_STREAM_STATE"
+STREAM_STATE_ID = "movie_complete"
+
 def parse_char(c):
     if not c or c == 'None': return []
     try:
@@ -16,76 +27,306 @@ def parse_char(c):
         return [c] # Retourne tel quel si ce n'est pas du JSON
 
 
-def migrate_in_batches(batch_size=10000):
+def build_movie_complete(movie, rating, genres, principals, persons, characters, titles):
+    """Construit le document dénormalisé MOVIE_COMPLETE d'un film.
+
+    persons : {pid: primaryName}, characters : {pid: [noms de personnages]}.
+    """
+    def member(p):
+        return {
+            "person_id": p.get("pid"),
+            "name": persons.get(p["pid"], "Unknown"),
+            "category": p.get("category"),
+            "ordering": p.get("ordering"),
+            "characters": characters.get(p["pid"], []),
+        }
+
+    return {
+        "_id": movie["mid"],
+        "title": movie.get("primaryTitle"),
+        "titleType": movie.get("titleType"),
+        "year": movie.get("startYear"),
+        "runtime": movie.get("runtimeMinutes"),
+        "genres": [g["genre"] for g in genres],
+        "rating": {
+            "average": rating["averageRating"] if rating else None,
+            "votes": rating["numVotes"] if rating else None
+        },
+        "cast": [member(p) for p in principals if p["category"] in ["actor", "actress"]],
+        "directors": [member(p) for p in principals if p["category"] == "director"],
+        # Le reste de l'équipe (producteurs, scénaristes...) pour la page détail
+        "crew": [member(p) for p in principals if p["category"] not in ["actor", "actress", "director"]],
+        "titles": [{"title": t.get("title"), "region": t.get("region")} for t in titles],
+    }
+
+
+def ensure_member_indexes(collection):
+    # Films où figure une personne : utilisés par watch_movie_complete.py pour les changements de nom.
+    # Créés sur MOVIE_COMPLETE_NEW avant la bascule, le renommage remplaçant la collection et ses index
+    for field in ("cast", "directors", "crew"):
+        db[collection].create_index(f"{field}.person_id")
+
+
+def grouped_by_mid(cursor):
+    """Regroupe un curseur trié par mid : (mid, [documents de ce mid])."""
+    current, group = None, []
+    for doc in cursor:
+        if group and doc["mid"] != current:
+            yield current, group
+            group = []
+        current = doc["mid"]
+        group.append(doc)
+    if group:
+        yield current, group
+
+
+class MergeJoin:
+    """Avance un curseur groupé par mid jusqu'au film demandé (jointure par fusion).
+
+    Tous les curseurs sont triés par mid comme celui de MOVIE : chaque
+    collection n'est parcourue qu'une fois, sans requête par film.
+    """
+
+    def __init__(self, cursor):
+        self.groups = grouped_by_mid(cursor)
+        self.pending = next(self.groups, None)
+
+    def take(self, mid):
+        while self.pending is not None and self.pending[0] < mid:
+            self.pending = next(self.groups, None)
+        if self.pending is not None and self.pending[0] == mid:
+            docs = self.pending[1]
+            self.pending = next(self.groups, None)
+            return docs
+        return []
+
+
+def ensure_sort_indexes():
     print("Vérification des index...")
-    db["PRINCIPAL"].create_index("mid")
+    db["MOVIE"].create_index("mid")
+    db["PRINCIPAL"].create_index([("mid", 1), ("ordering", 1)])
     db["RATING"].create_index("mid")
     db["GENRE"].create_index("mid")
     db["PERSON"].create_index("pid")
+    db["CHARACTER"].create_index("mid")
+    db["TITLE"].create_index("mid")
 
-    total_movies = db["MOVIE"].count_documents({})
-    cursor = db["MOVIE"].find({})
-    
-    batch = []
-    processed = 0
-    start_time = time.time()
 
-    print(f"Début de la migration de {total_movies} films...")
+def sorted_cursor(collection, projection, query=None, extra_sort=None):
+    sort = [("mid", 1)] + (extra_sort or [])
+    return db[collection].find(query or {}, projection, no_cursor_timeout=True).sort(sort).batch_size(10000)
+
 
-    for movie in cursor:
+def build_batch(movies, joins):
+    """Construit les documents d'un lot de films ; une seule requête PERSON pour tout le lot."""
+    related = []
+    pids = set()
+    for movie in movies:
         mid = movie["mid"]
-        
-        # 1. Récupération des données liées (requêtes ciblées)
-        rating = db["RATING"].find_one({"mid": mid}, {"_id": 0, "averageRating": 1, "numVotes": 1})
-        genres = list(db["GENRE"].find({"mid": mid}, {"_id": 0, "genre": 1}))
-        principals = list(db["PRINCIPAL"].find({"mid": mid}))
-        
-        # 2. Récupération des noms des personnes impliquées
-        pids = [p["pid"] for p in principals]
-        persons = {p["pid"]: p["primaryName"] for p in db["PERSON"].find({"pid": {"$in": pids}}, {"pid": 1, "primaryName": 1})}
-
-
-
-        # 3. Construction du document dénormalisé
-        movie_complete = {
-            "_id": mid,
-            "title": movie.get("primaryTitle"),
-            "year": movie.get("startYear"),
-            "runtime": movie.get("runtimeMinutes"),
-            "genres": [g["genre"] for g in genres],
-            "rating": {
-                "average": rating["averageRating"] if rating else None,
-                "votes": rating["numVotes"] if rating else None
-            },
-            # DANS VOTRE BOUCLE DE MIGRATION, modifiez la partie 'cast' :
-            "cast": [
-                {
-                    "person_id": p.get("pid"),
-                    "name": persons.get(p["pid"], "Unknown"),
-                    "characters": parse_char(p.get("characters")), # TRANSFORMATION ICI
-                    "ordering": p.get("ordering")
-                } for p in principals if p["category"] in ["actor", "actress"]
-            ],
-            "directors": [
-                {
-                    "name": persons.get(p["pid"], "Unknown")
-                } for p in principals if p["category"] == "director"
-            ]
-        }
+        rows = {name: join.take(mid) for name, join in joins.items()}
+        related.append((movie, rows))
+        pids.update(p["pid"] for p in rows["principals"])
+
+    persons = {
+        p["pid"]: p["primaryName"]
+        for p in db["PERSON"].find({"pid": {"$in": list(pids)}}, {"_id": 0, "pid": 1, "primaryName": 1})
+    }
+
+    documents = []
+    for movie, rows in related:
+        characters = {}
+        for c in rows["characters"]:
+            characters.setdefault(c["pid"], []).extend(parse_char(c.get("name")))
+        rating = rows["ratings"][0] if rows["ratings"] else None
+        documents.append(build_movie_complete(
+            movie, rating, rows["genres"], rows["principals"], persons, characters, rows["titles"]
+        ))
+    return documents
+
+
+def open_joins(query):
+    return {
+        "ratings": MergeJoin(sorted_cursor("RATING", {"_id": 0, "mid": 1, "averageRating": 1, "numVotes": 1}, query)),
+        "genres": MergeJoin(sorted_cursor("GENRE", {"_id": 0, "mid": 1, "genre": 1}, query)),
+        "principals": MergeJoin(sorted_cursor("PRINCIPAL", {"_id": 0}, query, [("ordering", 1)])),
+        "characters": MergeJoin(sorted_cursor("CHARACTER", {"_id": 0, "mid": 1, "pid": 1, "name": 1}, query)),
+        "titles": MergeJoin(sorted_cursor("TITLE", {"_id": 0, "mid": 1, "title": 1, "region": 1}, query)),
+    }
+
+
+def build_documents(mids):
+    """Documents MOVIE_COMPLETE d'une liste de films (mise à jour ciblée, voir watch_movie_complete.py)."""
+    query = {"mid": {"$in": list(mids)}}
+    movies = list(sorted_cursor("MOVIE", {"_id": 0}, query))
+    return build_batch(movies, open_joins(query)) if movies else []
+
+
+def rebuild_movie_complete(batch_size=10000, query=None, target="MOVIE_COMPLETE_NEW"):
+    """Reconstruit MOVIE_COMPLETE par parcours triés de chaque collection.
 
-        # Utilisation de ReplaceOne pour permettre la reprise en cas d'erreur
-        batch.append(pymongo.ReplaceOne({"_id": mid}, movie_complete, upsert=True))
-        
+    Les documents sont seulement écrits dans target : la bascule vers
+    MOVIE_COMPLETE (renameCollection, comme SEARCH_INDEX) est faite par
+    l'appelant, migrate_in_batches ou build_parallel une fois toutes les
+    plages construites. query restreint les films traités (plage de mid),
+    utilisé par les processus du constructeur parallèle.
+    """
+    query = query or {}
+    total_movies = db["MOVIE"].count_documents(query)
+    print(f"Début de la reconstruction de {total_movies} films...")
+
+    joins = open_joins(query)
+
+    processed = 0
+    start_time = time.time()
+    batch = []
+    for movie in sorted_cursor("MOVIE", {"_id": 0}, query):
+        batch.append(movie)
         if len(batch) >= batch_size:
-            db["MOVIE_COMPLETE"].bulk_write(batch)
+            db[target].insert_many(build_batch(batch, joins), ordered=False)
+            processed += len(batch)
             batch = []
-            processed += batch_size
-            print(f"Progression : {processed}/{total_movies} films traités...")
+            elapsed = time.time() - start_time
+            print(f"Progression : {processed}/{total_movies} films ({processed / elapsed:.0f} docs/s)")
 
     if batch:
-        db["MOVIE_COMPLETE"].bulk_write(batch)
+        db[target].insert_many(build_batch(batch, joins), ordered=False)
+        processed += len(batch)
+
+    elapsed = time.time() - start_time
+    print(f"✅ {processed} documents en {elapsed:.2f}s ({processed / elapsed if elapsed else processed:.0f} docs/s)")
+    return processed
+
+
+def begin_rebuild():
+    """Note la position du change stream avant de lire les collections sources.
+
+    Tant que rebuild_token existe, watch_movie_complete.py n'écrit plus dans
+    MOVIE_COMPLETE : ses patches iraient à l'ancienne collection, remplacée
+    à la bascule. Une reconstruction reprise (--resume) garde la position
+    de son premier lancement.
+    """
+    state = db[STREAM_STATE].find_one({"_id": STREAM_STATE_ID}) or {}
+    if state.get("rebuild_token") is not None:
+        return
+    with db.watch() as stream:
+        token = stream.resume_token
+    if token is None:
+        raise RuntimeError("Position du change stream indisponible (replica set MongoDB 4.0.7 ou plus requis)")
+    db[STREAM_STATE].update_one(
+        {"_id": STREAM_STATE_ID},
+        {"$set": {"rebuild_token": token, "rebuild_started_at": time.time()}},
+        upsert=True
+    )
+
+
+def end_rebuild():
+    """Après la bascule : le suivi repart de la position notée par begin_rebuild.
+
+    Les changements survenus pendant la construction sont ainsi rejoués
+    sur la nouvelle collection (les appliquer deux fois ne change rien).
+    """
+    state = db[STREAM_STATE].find_one({"_id": STREAM_STATE_ID}) or {}
+    if state.get("rebuild_token") is None:
+        return
+    db[STREAM_STATE].update_one(
+        {"_id": STREAM_STATE_ID},
+        {"$set": {"token": state["rebuild_token"], "saved_at": time.time()},
+         "$unset": {"rebuild_token": "", "rebuild_started_at": ""}}
+    )
+
+
+def migrate_in_batches(batch_size=10000):
+    ensure_sort_indexes()
+    begin_rebuild()
+    db["MOVIE_COMPLETE_NEW"].drop()
+    rebuild_movie_complete(batch_size)
+    ensure_member_indexes("MOVIE_COMPLETE_NEW")
+    db["MOVIE_COMPLETE_NEW"].rename("MOVIE_COMPLETE", dropTarget=True)
+    end_rebuild()
+
+def split_ranges(partitions):
+    """Découpe l'espace des mid en plages de tailles voisines : [(lo, hi), ...], hi exclu.
+
+    Un seul parcours de l'index MOVIE.mid (projection sur mid uniquement).
+    """
+    total = db["MOVIE"].count_documents({})
+    step = max(1, -(-total // partitions))
+    bounds = []
+    for position, doc in enumerate(db["MOVIE"].find({}, {"_id": 0, "mid": 1}).sort("mid", 1)):
+        if position % step == 0:
+            bounds.append(doc["mid"])
+    return [(lo, bounds[i + 1] if i + 1 < len(bounds) else None) for i, lo in enumerate(bounds)]
+
+
+def range_query(lo, hi):
+    return {"mid": {"$gte": lo, "$lt": hi}} if hi is not None else {"mid": {"$gte": lo}}
+
+
+def init_worker():
+    # Chaque processus a son propre client : pymongo ne supporte pas d'être partagé après fork
+    global client, db
+    client = pymongo.MongoClient(MONGO_URI)
+    db = client["MongoDB"]
+
+
+def build_range(task):
+    """Construit une plage ; repartir de zéro sur la plage la rend rejouable après un crash."""
+    range_id, lo, hi, batch_size = task
+    start = time.time()
+    query = range_query(lo, hi)
+    db["MOVIE_COMPLETE_NEW"].delete_many({"_id": query["mid"]})
+    docs = rebuild_movie_complete(batch_size, query)
+    db[PROGRESS].update_one(
+        {"_id": range_id},
+        {"$set": {"status": "done", "docs": docs, "seconds": time.time() - start}}
+    )
+    return range_id, docs
+
+
+def build_parallel(workers, partitions, batch_size=10000, resume=False):
+    """Reconstruit MOVIE_COMPLETE par plages de mid traitées dans un pool de processus.
+
+    Les plages terminées sont notées dans MOVIE_COMPLETE_PROGRESS ; avec
+    resume=True, seules les plages non terminées sont refaites.
+    """
+    ensure_sort_indexes()
+    begin_rebuild()
+    if not resume or db[PROGRESS].count_documents({}) == 0:
+        db["MOVIE_COMPLETE_NEW"].drop()
+        db[PROGRESS].drop()
+        ranges = split_ranges(partitions)
+        db[PROGRESS].insert_many([
+            {"_id": i, "lo": lo, "hi": hi, "status": "pending"} for i, (lo, hi) in enumerate(ranges)
+        ])
+        print(f"{len(ranges)} plages de mid à construire")
+
+    todo = [(r["_id"], r["lo"], r["hi"], batch_size) for r in db[PROGRESS].find({"status": {"$ne": "done"}}).sort("_id", 1)]
+    done_before = db[PROGRESS].count_documents({"status": "done"})
+    print(f"{len(todo)} plages à traiter ({done_before} déjà terminées)")
+
+    start = time.time()
+    docs = 0
+    with Pool(workers, initializer=init_worker) as pool:
+        for range_id, range_docs in pool.imap_unordered(build_range, todo):
+            docs += range_docs
+            elapsed = time.time() - start
+            print(f"Plage {range_id} terminée : {docs} documents ({docs / elapsed:.0f} docs/s)")
+
+    # Toutes les plages sont faites : la nouvelle collection remplace l'ancienne
+    ensure_member_indexes("MOVIE_COMPLETE_NEW")
+    db["MOVIE_COMPLETE_NEW"].rename("MOVIE_COMPLETE", dropTarget=True)
+    db[PROGRESS].drop()
+    end_rebuild()
+    elapsed = time.time() - start
+    print(f"✅ MOVIE_COMPLETE reconstruite : {docs} documents en {elapsed:.2f}s ({docs / elapsed if elapsed else docs:.0f} docs/s)")
 
-    print(f"✅ Migration terminée en {time.time() - start_time:.2f}s")
 
 if __name__ == "__main__":
-    migrate_in_batches()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Construction de MOVIE_COMPLETE")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processus de construction")
+    parser.add_argument('--partitions', type=int, help="Nombre de plages de mid (défaut : 4 par processus)")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Films par lot")
+    parser.add_argument('--resume', action='store_true', help="Reprend une construction interrompue")
+    args = parser.parse_args()
+
+    build_parallel(args.workers, args.partitions or args.workers * 4, args.batch_size, args.resume)
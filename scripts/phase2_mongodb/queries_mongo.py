@@ -1,12 +1,16 @@
 #mongod --dbpath ./data/mongo/standalone/
 
 import pandas as pd
-import time
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING
 
-# Connexion à MongoDB
-client = MongoClient('mongodb://localhost:27017/')
-db = client['MongoDB']
+# Les neuf requêtes d'analyse, version MongoDB. Chacune renvoie son DataFrame :
+# les fonctions sans suffixe lisent les collections plates (avec $lookup),
+# les fonctions *_Complete lisent MOVIE_COMPLETE / PERSON_COMPLETE.
+# Les mesures se font avec le harnais commun :
+#   python scripts/benchmark.py --backend mongo_flat|mongo_structured
+
+# Base ouverte par le harnais de mesure
+db = None
 
 def Filmographie(name):
     pipeline = [
@@ -56,8 +60,7 @@ def Filmographie(name):
 
     # Exécution sur la collection PERSON
     data = list(db.PERSON.aggregate(pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 def Top_Film(genre_name, debut, fin, N):
     pipeline = [
@@ -103,8 +106,7 @@ def Top_Film(genre_name, debut, fin, N):
 
     # Exécution sur la collection MOVIE
     data = list(db.MOVIE.aggregate(pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
 def Multi_Role():
@@ -163,8 +165,7 @@ def Multi_Role():
 
     # On commence par la collection CHARACTER car c'est la base du groupement
     data = list(db.CHARACTER.aggregate(pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
 def Collaboration(actor):
@@ -221,8 +222,7 @@ def Collaboration(actor):
     ]
 
     data = list(db.DIRECTOR.aggregate(collaboration_pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
 
@@ -277,8 +277,7 @@ def Genre_Populaire():
 
     # On commence par la collection MOVIE car le filtre initial (titleType) est dedans
     data = list(db.MOVIE.aggregate(pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
 def Evolution_Carriere(acteur_nom):
@@ -347,8 +346,7 @@ def Evolution_Carriere(acteur_nom):
     ]
 
     data = list(db.PERSON.aggregate(pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
 def Meilleur_Film_Par_Genre():
@@ -401,8 +399,7 @@ def Meilleur_Film_Par_Genre():
     ]
 
     data = list(db.MOVIE.aggregate(pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
 
@@ -490,8 +487,7 @@ def Carriere_Propulse():
 
     # Utilisation de allowDiskUse car les Window Functions sur de gros volumes sont gourmandes en RAM
     data = list(db.MOVIE.aggregate(pipeline, allowDiskUse=True))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
 def Derniere():
@@ -533,102 +529,262 @@ def Derniere():
 
     # Exécution
     data = list(db.MOVIE.aggregate(pipeline))
-    df = pd.DataFrame(data)
-    print(df.head(5))
+    return pd.DataFrame(data)
 
 
+# --- Mêmes requêtes sur les documents dénormalisés : MOVIE_COMPLETE (migrate_structured.py)
+# et PERSON_COMPLETE (build_person_complete.py), sans $lookup ---
 
+def Filmographie_Complete(name):
+    data = []
+    for person in db.PERSON_COMPLETE.find({"name": {"$regex": f"^{name}", "$options": "i"}}, {"credits": 1}):
+        data += [
+            {"Titre": c.get("title"), "Année": c.get("year"), "Note": c.get("rating")}
+            for c in person["credits"]
+        ]
+    return pd.DataFrame(data)
 
+def Top_Film_Complete(genre_name, debut, fin, N):
+    # MOVIE_COMPLETE ne garde pas endYear : la période porte sur l'année de sortie
+    pipeline = [
+        { "$match": {
+            "genres": genre_name,
+            "year": { "$gt": debut, "$lt": fin }
+        }},
+        { "$project": {
+            "_id": 0,
+            "Film": "$title",
+            "Année": "$year",
+            "Note": "$rating.average"
+        }},
+        { "$sort": { "Note": -1 } },
+        { "$limit": N }
+    ]
 
+    data = list(db.MOVIE_COMPLETE.aggregate(pipeline))
+    return pd.DataFrame(data)
 
+def Multi_Role_Complete():
+    pipeline = [
+        { "$match": { "cast.characters.1": { "$exists": True } } },
+        { "$unwind": "$cast" },
+        { "$project": {
+            "_id": 0,
+            "Acteur": "$cast.name",
+            "Film": "$title",
+            "Nb_Roles": { "$size": { "$setUnion": [{ "$ifNull": ["$cast.characters", []] }, []] } }
+        }},
+        { "$match": { "Nb_Roles": { "$gt": 1 } } },
+        { "$sort": { "Nb_Roles": -1, "Acteur": 1 } }
+    ]
 
+    data = list(db.MOVIE_COMPLETE.aggregate(pipeline, allowDiskUse=True))
+    return pd.DataFrame(data)
+
+def Collaboration_Complete(actor):
+    # Films de l'acteur (rôles avec personnage) lus dans sa filmographie, puis leurs réalisateurs
+    mids = set()
+    for person in db.PERSON_COMPLETE.find({"name": actor}, {"credits.mid": 1, "credits.characters": 1}):
+        mids.update(c["mid"] for c in person["credits"] if c.get("characters"))
+
+    if not mids:
+        return pd.DataFrame(columns=['Realisateur', 'Nombre_de_Films'])
+
+    pipeline = [
+        { "$match": { "_id": { "$in": list(mids) } } },
+        { "$unwind": "$directors" },
+        { "$group": {
+            "_id": "$directors.name",
+            "Nombre_de_Films": { "$sum": 1 }
+        }},
+        { "$project": {
+            "_id": 0,
+            "Realisateur": "$_id",
+            "Nombre_de_Films": 1
+        }},
+        { "$sort": { "Nombre_de_Films": -1, "Realisateur": 1 } }
+    ]
+
+    data = list(db.MOVIE_COMPLETE.aggregate(pipeline))
+    return pd.DataFrame(data)
+
+def Genre_Populaire_Complete():
+    pipeline = [
+        { "$match": { "titleType": "movie", "rating.average": { "$ne": None } } },
+        { "$unwind": "$genres" },
+        { "$group": {
+            "_id": "$genres",
+            "Note_Moyenne_Brute": { "$avg": "$rating.average" },
+            "Nombre_de_Films": { "$sum": 1 }
+        }},
+        { "$match": {
+            "Note_Moyenne_Brute": { "$gt": 7.0 },
+            "Nombre_de_Films": { "$gt": 50 }
+        }},
+        { "$project": {
+            "_id": 0,
+            "Genre": "$_id",
+            "Note_Moyenne": { "$round": ["$Note_Moyenne_Brute", 2] },
+            "Nombre_de_Films": 1
+        }},
+        { "$sort": { "Note_Moyenne": -1 } }
+    ]
+
+    data = list(db.MOVIE_COMPLETE.aggregate(pipeline))
+    return pd.DataFrame(data)
+
+def Evolution_Carriere_Complete(acteur_nom):
+    pipeline = [
+        { "$match": { "name": acteur_nom } },
+        { "$unwind": "$credits" },
+        { "$match": {
+            # Rôles avec personnage, comme la jointure sur CHARACTER
+            "credits.characters.0": { "$exists": True },
+            "credits.titleType": "movie",
+            "credits.year": { "$ne": None },
+            "credits.rating": { "$ne": None }
+        }},
+        { "$group": {
+            "_id": { "$multiply": [{ "$floor": { "$divide": ["$credits.year", 10] } }, 10] },
+            "Nombre_Films": { "$sum": 1 },
+            "Note_Moyenne": { "$avg": "$credits.rating" }
+        }},
+        { "$project": {
+            "_id": 0,
+            "Periode": "$_id",
+            "Nombre_Films": 1,
+            "Note": { "$round": ["$Note_Moyenne", 2] }
+        }},
+        { "$sort": { "Periode": 1 } }
+    ]
+
+    data = list(db.PERSON_COMPLETE.aggregate(pipeline))
+    return pd.DataFrame(data)
+
+def Meilleur_Film_Par_Genre_Complete():
+    pipeline = [
+        { "$match": { "titleType": "movie", "rating.votes": { "$gt": 10000 } } },
+        { "$unwind": "$genres" },
+        { "$setWindowFields": {
+            "partitionBy": "$genres",
+            "sortBy": { "rating.average": -1 },
+            "output": {
+                "Rang": { "$rank": {} }
+            }
+        }},
+        { "$match": { "Rang": { "$lte": 3 } }},
+        { "$project": {
+            "_id": 0,
+            "Genre": "$genres",
+            "Film": "$title",
+            "Note": "$rating.average",
+            "Rang": 1
+        }},
+        { "$sort": { "Genre": 1, "Rang": 1 } }
+    ]
+
+    data = list(db.MOVIE_COMPLETE.aggregate(pipeline))
+    return pd.DataFrame(data)
+
+def Carriere_Propulse_Complete():
+    # Premier succès (> 200 000 votes) qui n'est pas le premier film, comme la version SQLite ;
+    # la carrière de chaque acteur est déjà dans son document
+    pipeline = [
+        { "$unwind": "$credits" },
+        { "$match": {
+            "credits.titleType": "movie",
+            "credits.votes": { "$ne": None },
+            "credits.characters.0": { "$exists": True }
+        }},
+        { "$setWindowFields": {
+            "partitionBy": "$_id",
+            "sortBy": { "credits.year": 1 },
+            "output": {
+                "FilmNum": { "$documentNumber": {} }
+            }
+        }},
+        { "$match": { "credits.votes": { "$gt": 200000 } } },
+        { "$setWindowFields": {
+            "partitionBy": "$_id",
+            "sortBy": { "credits.year": 1 },
+            "output": {
+                "OrdreSucces": { "$documentNumber": {} }
+            }
+        }},
+        { "$match": { "OrdreSucces": 1, "FilmNum": { "$gt": 1 } } },
+        { "$project": {
+            "_id": 0,
+            "Nom": "$name",
+            "Film": "$credits.title"
+        }},
+        { "$sort": { "Nom": 1 } }
+    ]
+
+    data = list(db.PERSON_COMPLETE.aggregate(pipeline, allowDiskUse=True))
+    return pd.DataFrame(data)
+
+def Derniere_Complete():
+    pipeline = [
+        { "$match": { "titleType": "movie", "rating.average": { "$gt": 9.0 } } },
+        { "$project": {
+            "_id": 0,
+            "Film": "$title",
+            "Note": "$rating.average",
+            # Personnes distinctes parmi casting, réalisateurs et équipe (COUNT DISTINCT pr.pid)
+            "Nombre_Total_Personnes": { "$size": { "$setUnion": [
+                { "$ifNull": ["$cast.person_id", []] },
+                { "$ifNull": ["$directors.person_id", []] },
+                { "$ifNull": ["$crew.person_id", []] }
+            ]}}
+        }},
+        { "$sort": { "Note": -1 } },
+        { "$limit": 3 }
+    ]
+
+    data = list(db.MOVIE_COMPLETE.aggregate(pipeline))
+    return pd.DataFrame(data)
 
 
 # --- Gestion des Index MongoDB ---
 
-def Fin_Index():
-    collections = ['movies', 'persons', 'characters', 'ratings', 'genres', 'directors', 'principals']
-    for col in collections:
-        db[col].drop_indexes()
-    print("Tous les index ont été supprimés.")
+INDEXES = [
+    ("PERSON", [("primaryName", ASCENDING)]),
+    ("CHARACTER", [("pid", ASCENDING)]),
+    ("CHARACTER", [("mid", ASCENDING)]),
+    ("MOVIE", [("startYear", ASCENDING)]),
+    ("RATING", [("averageRating", DESCENDING)]),
+    ("GENRE", [("genre", ASCENDING)]),
+]
 
-def Create_Indexes():
-    db.persons.create_index([("primaryName", ASCENDING)])
-    db.characters.create_index([("pid", ASCENDING)])
-    db.characters.create_index([("mid", ASCENDING)])
-    db.movies.create_index([("startYear", ASCENDING)])
-    db.ratings.create_index([("averageRating", DESCENDING)])
-    db.genres.create_index([("genre", ASCENDING)])
-    print("Index MongoDB créés.")
+def index_name(keys):
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
 
+# Index créés par Create_Indexes, notés dans META : Fin_Index ne supprime qu'eux.
+# Un index de la liste déjà présent (ex. CHARACTER mid_1, créé par migrate_structured.py)
+# appartient à la migration et reste en place.
+OWNED_INDEXES = "benchmark_indexes"
 
-# --- Exécution du Benchmark ---
+def Fin_Index():
+    owned = db["META"].find_one({"_id": OWNED_INDEXES}) or {"indexes": []}
+    for collection, name in owned["indexes"]:
+        if name in db[collection].index_information():
+            db[collection].drop_index(name)
+    db["META"].delete_one({"_id": OWNED_INDEXES})
+    print("Index de la comparaison supprimés.")
 
-# Connexion à MongoDB
-client = MongoClient('mongodb://localhost:27017/')
-db = client['MongoDB'] # Assure-toi que c'est le même nom partout
+def Create_Indexes():
+    for collection, keys in INDEXES:
+        if index_name(keys) in db[collection].index_information():
+            continue
+        db[collection].create_index(keys)
+        db["META"].update_one(
+            {"_id": OWNED_INDEXES},
+            {"$addToSet": {"indexes": [collection, index_name(keys)]}},
+            upsert=True
+        )
+    print("Index MongoDB créés.")
 
 def get_db_size():
     # Récupère la taille des données + index en Mo
     stats = db.command("dbStats")
     return stats['storageSize'] / (1024 * 1024)
-
-# --- Garde tes fonctions Filmographie, Top_Film, etc. telles quelles ---
-# (Elles sont correctes suite à nos échanges précédents)
-
-def run_benchmarks_detailed():
-    results = {}
-    tasks = [
-        (Filmographie, ["Tom Hanks"]),
-        (Top_Film, ["Comedy", 1980, 2000, 10]),
-        (Multi_Role, []),
-        (Collaboration, ["Tom Hanks"]),
-        (Genre_Populaire, []),
-        (Evolution_Carriere, ["Clint Eastwood"]),
-        (Meilleur_Film_Par_Genre, []),
-        (Carriere_Propulse, []),
-        (Derniere, [])
-        
-    ]
-    
-    for func, args in tasks:
-        s = time.time()
-        func(*args) if args else func()
-        e = time.time()
-        results[func.__name__] = round((e - s) * 1000, 2)
-        
-    return results
-
-# --- Exécution du Benchmark corrigée ---
-
-# 1. Nettoyage et Mesure Sans Index
-Fin_Index()
-# On attend un peu que MongoDB traite la suppression des index
-time.sleep(2) 
-size_before = get_db_size()
-
-print("Calcul des temps sans index...")
-temps_sans = run_benchmarks_detailed()
-
-# 2. Création des Index
-print("Création des index...")
-Create_Indexes()
-
-# 3. Mesure Avec Index
-size_after = get_db_size()
-print("Calcul des temps avec index...")
-temps_avec = run_benchmarks_detailed()
-
-# --- 4. Affichage du Tableau Final ---
-print("\n" + "="*85)
-print(f"{'Requêtes':<25} | {'Sans index (ms)':<15} | {'Avec index (ms)':<15} | {'Gain (%)':<10}")
-print("-" * 85)
-
-for nom in temps_sans.keys():
-    t_sans = temps_sans[nom]
-    t_avec = temps_avec[nom]
-    gain = round(((t_sans - t_avec) / t_sans) * 100, 2) if t_sans > 0 else 0
-    print(f"{nom:<25} | {t_sans:<15} | {t_avec:<15} | {gain:<10}%")
-
-print("="*85)
-print(f"Taille de la base : {round(size_before, 2)} Mo (Sans) -> {round(size_after, 2)} Mo (Avec)")
@@ -0,0 +1,213 @@
+import argparse
+import time
+
+from pymongo import DeleteOne, MongoClient, ReplaceOne, UpdateMany, UpdateOne
+
+import migrate_structured as structured
+
+# Maintient MOVIE_COMPLETE à jour en suivant les change streams du replica set
+# (toutes les collections lues par migrate_structured.build_documents, plus
+# PERSON pour les noms), sans reconstruction complète.
+#   python scripts/phase2_mongodb/watch_movie_complete.py
+# Le resume token est sauvegardé dans CHANGE_STREAM_STATE après chaque lot :
+# au redémarrage, le suivi reprend là où il s'était arrêté.
+#
+# Pendant une reconstruction (migrate_structured.py), le suivi s'interrompt :
+# ses écritures iraient à la collection remplacée par la bascule. Il reprend
+# ensuite à la position notée au début de la reconstruction.
+#
+# Un événement de suppression ne contient que l'_id de la ligne supprimée
+# (pas son mid, et pymongo 3.11 ne sait pas demander les pre-images) :
+# migrate_flat.py --incremental note donc dans MOVIE_COMPLETE_DIRTY les
+# films dont il supprime des lignes, et ces films sont reconstruits ici.
+
+WATCHED = ["MOVIE", "RATING", "GENRE", "PRINCIPAL", "CHARACTER", "TITLE", "PERSON"]
+DIRTY = "MOVIE_COMPLETE_DIRTY"
+STATE = structured.STREAM_STATE
+STATE_ID = structured.STREAM_STATE_ID
+
+# Un lot est appliqué dès qu'il atteint BATCH_SIZE événements ou MAX_WAIT secondes
+BATCH_SIZE = 1000
+MAX_WAIT = 2.0
+
+# Attente entre deux vérifications de la fin d'une reconstruction (s)
+REBUILD_POLL = 5.0
+
+
+def load_token(db):
+    state = db[STATE].find_one({"_id": STATE_ID})
+    return state["token"] if state else None
+
+
+def rebuild_in_progress(db):
+    # Marqueur posé par migrate_structured.begin_rebuild, ou construction laissée en cours
+    state = db[STATE].find_one({"_id": STATE_ID}) or {}
+    if state.get("rebuild_token") is not None:
+        return True
+    collections = db.list_collection_names()
+    return "MOVIE_COMPLETE_NEW" in collections or structured.PROGRESS in collections
+
+
+def save_token(db, token):
+    db[STATE].update_one({"_id": STATE_ID}, {"$set": {"token": token, "saved_at": time.time()}}, upsert=True)
+
+
+def rating_patch(doc):
+    return UpdateOne(
+        {"_id": doc["mid"]},
+        {"$set": {"rating": {"average": doc.get("averageRating"), "votes": doc.get("numVotes")}}}
+    )
+
+
+def person_patch(doc, only_if_different=False):
+    # Renomme la personne dans les trois listes, uniquement aux positions qui la concernent
+    pid, name = doc["pid"], doc.get("primaryName")
+    member = {"person_id": pid, "name": {"$ne": name}} if only_if_different else {"person_id": pid}
+    return UpdateMany(
+        {"$or": [{field: {"$elemMatch": member}} for field in ("cast", "directors", "crew")]},
+        {"$set": {f"{field}.$[member].name": name for field in ("cast", "directors", "crew")}},
+        array_filters=[{"member.person_id": pid}]
+    )
+
+
+def person_event_patch(event):
+    """Patch du nom pour un événement PERSON, ou None s'il ne peut pas l'avoir changé.
+
+    update : seulement si primaryName fait partie des champs modifiés.
+    replace (migrate_flat.py --incremental) : on ne sait pas ce qui a changé,
+    le filtre ne retient que les films où le nom enregistré diffère.
+    insert : une nouvelle personne n'apparaît que via PRINCIPAL, dont les
+    films sont reconstruits avec les noms à jour.
+    """
+    if event["operationType"] == "update":
+        if "primaryName" not in event.get("updateDescription", {}).get("updatedFields", {}):
+            return None
+        return person_patch(event["fullDocument"])
+    if event["operationType"] == "replace":
+        return person_patch(event["fullDocument"], only_if_different=True)
+    return None
+
+
+def plan_batch(events):
+    """Transforme un lot d'événements en écritures sur MOVIE_COMPLETE.
+
+    RATING et PERSON sont patchés directement depuis le document reçu ;
+    MOVIE, GENRE, PRINCIPAL, CHARACTER et TITLE font reconstruire les films
+    concernés (titre, genres, casting, personnages et titres alternatifs
+    dépendent de plusieurs lignes), de même que les films notés
+    dans MOVIE_COMPLETE_DIRTY. Un film qui n'existe plus est supprimé. Les
+    suppressions des collections suivies, sans mid, sont comptées et ignorées :
+    le marqueur posé par migrate_flat.py couvre ces films.
+    Renvoie aussi les marqueurs traités, à effacer après l'écriture.
+    """
+    operations = []
+    rebuild = set()
+    markers = []
+    skipped = 0
+
+    for event in events:
+        collection = event["ns"]["coll"]
+        doc = event.get("fullDocument")
+        if collection == DIRTY:
+            markers.append(event["documentKey"]["_id"])
+            rebuild.add(event["documentKey"]["_id"])
+        elif event["operationType"] == "delete" or doc is None:
+            skipped += 1
+        elif collection == "RATING":
+            operations.append(rating_patch(doc))
+        elif collection == "PERSON":
+            patch = person_event_patch(event)
+            if patch is None:
+                skipped += 1
+            else:
+                operations.append(patch)
+        else:
+            rebuild.add(doc["mid"])
+
+    if rebuild:
+        documents = structured.build_documents(rebuild)
+        operations += [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents]
+        operations += [DeleteOne({"_id": mid}) for mid in rebuild - {document["_id"] for document in documents}]
+    return operations, len(rebuild), skipped, markers
+
+
+def apply_batch(db, events, token):
+    operations, rebuilt, skipped, markers = plan_batch(events)
+    if operations:
+        # Ordonné : deux événements sur le même film s'appliquent dans l'ordre reçu
+        db["MOVIE_COMPLETE"].bulk_write(operations, ordered=True)
+    if markers:
+        # Un marqueur reposé entre-temps a produit un nouvel événement : rien n'est perdu
+        db[DIRTY].delete_many({"_id": {"$in": markers}})
+    # Le token n'est sauvegardé qu'une fois le lot écrit (rejouer un lot ne change rien)
+    save_token(db, token)
+    print(f"{len(events)} événements : {len(operations)} écritures, {rebuilt} films reconstruits, {skipped} ignorés")
+
+
+def wait_for_rebuild(db, poll=REBUILD_POLL):
+    if not rebuild_in_progress(db):
+        return
+    print("Reconstruction de MOVIE_COMPLETE en cours : suivi suspendu")
+    while rebuild_in_progress(db):
+        time.sleep(poll)
+    print("Reconstruction terminée : reprise à la position notée avant la construction")
+
+
+def watch(db, batch_size=BATCH_SIZE, max_wait=MAX_WAIT):
+    while True:
+        wait_for_rebuild(db)
+        follow(db, batch_size, max_wait)
+
+
+def follow(db, batch_size, max_wait):
+    """Applique les événements jusqu'au début d'une reconstruction.
+
+    Le lot en attente n'est alors ni écrit ni sauvegardé : la reconstruction
+    lit les collections sources, et le suivi rejouera ces événements depuis
+    la position qu'elle a notée.
+    """
+    pipeline = [{"$match": {"$or": [
+        {"ns.coll": {"$in": WATCHED}, "operationType": {"$in": ["insert", "update", "replace", "delete"]}},
+        # Pose des marqueurs seulement : leur effacement vient de ce processus
+        {"ns.coll": DIRTY, "operationType": {"$in": ["insert", "update", "replace"]}},
+    ]}}]
+    token = load_token(db)
+    print("Reprise au dernier token sauvegardé" if token else "Pas de token : suivi à partir de maintenant")
+
+    with db.watch(pipeline, full_document="updateLookup", resume_after=token) as stream:
+        events = []
+        started = time.time()
+        while stream.alive:
+            event = stream.try_next()
+            if event is not None:
+                events.append(event)
+            if events and (len(events) >= batch_size or time.time() - started >= max_wait):
+                if rebuild_in_progress(db):
+                    return
+                apply_batch(db, events, stream.resume_token)
+                events = []
+            if not events:
+                started = time.time()
+            if event is None:
+                time.sleep(0.1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mise à jour continue de MOVIE_COMPLETE par change streams")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Événements par lot d'écritures")
+    parser.add_argument('--max-wait', type=float, default=MAX_WAIT, help="Délai max avant d'appliquer un lot (s)")
+    args = parser.parse_args()
+
+    mongo_uri = "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+    client = MongoClient(mongo_uri)
+    db = client["MongoDB"]
+    structured.db = db
+
+    # Index déjà posés par migrate_structured.py ; recréés ici pour une collection plus ancienne
+    structured.ensure_member_indexes("MOVIE_COMPLETE")
+    try:
+        watch(db, args.batch_size, args.max_wait)
+    except KeyboardInterrupt:
+        print("Arrêt du suivi")
+    finally:
+        client.close()